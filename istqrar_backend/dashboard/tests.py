@@ -1,3 +1,40 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from loans.models import Loan
+from loans.services import build_installments
+
+User = get_user_model()
+
+
+class DashboardLoanTests(TestCase):
+    def setUp(self):
+        self.borrower = User.objects.create(username='borrower')
+        self.client = APIClient()
+        self.client.force_authenticate(self.borrower)
+
+    def loan(self, start, months):
+        loan = Loan.objects.create(
+            user=self.borrower, amount=1200, purpose='stock', repayment_period=months, status='APPROVED',
+            due_date=start + timedelta(days=30 * months),
+        )
+        build_installments([loan], start=start)
+        return loan
+
+    def test_next_payment_is_the_oldest_open_installment(self):
+        # the long loan ends last but its next installment is due first
+        long_loan = self.loan(date(2026, 1, 1), months=12)
+        self.loan(date(2026, 3, 1), months=3)
+        first, second = long_loan.installments.order_by('number')[:2]
+        first.status = 'PAID'
+        first.save()
+
+        response = self.client.get('/api/dashboard/')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['active_loan']['id'], long_loan.pk)
+        self.assertEqual(response.data['active_loan']['next_payment_date'], second.due_date)
+        self.assertEqual(response.data['active_loan']['active_loan_count'], 2)
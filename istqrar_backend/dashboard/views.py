@@ -1,10 +1,12 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db.models import F
 from django.utils import timezone
 from users.models import TrustScore
 from gameya.models import Gameya, Membership, Contribution
 from loans.models import Loan
+from loans.services import next_due_date
 from wallet.models import Transaction
 
 
@@ -31,17 +33,23 @@ class DashboardView(APIView):
                 "contribution_amount": float(g.contribution_amount),
                 "current_round": g.current_round,
                 "duration_months": g.duration_months,
-                "next_payout_date": g.get_next_payout_date(),
+                "next_payout_date": g.next_payout_date,
                 "progress": round((g.current_round / g.duration_months) * 100, 2),
             }
 
         # --- ACTIVE LOAN ---
         active_loan = None
-        loan = Loan.objects.filter(user=user, status="APPROVED").first()
+        active_loans = Loan.objects.filter(user=user, status="APPROVED")
+        # the loan whose oldest open installment is due first, as in loans/active
+        loan = (
+            active_loans.annotate(next_due=next_due_date())
+            .order_by(F('next_due').asc(nulls_last=True), 'pk')
+            .first()
+        )
 
         if loan:
-            total_due = loan.amount + (loan.amount * (loan.interest_rate / 100))
-            repayments_sum = sum((r.amount for r in loan.repayments.filter(is_paid=True)), 0)
+            total_due = loan.total_due
+            repayments_sum = loan.total_repaid
 
             active_loan = {
                 "id": loan.id,
@@ -51,7 +59,8 @@ class DashboardView(APIView):
                 "total_repaid": float(repayments_sum),
                 "remaining": float(total_due - repayments_sum),
                 "progress": round((repayments_sum / total_due) * 100, 2),
-                "next_payment_date": loan.due_date
+                "next_payment_date": loan.next_due,
+                "active_loan_count": active_loans.count(),
             }
 
         # --- RECENT TRANSACTIONS ---
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from users.utils import bulk_adjust_trust_scores
+from wallet.models import Wallet
+from wallet.services import bulk_debit
+from .models import Gameya, Membership, Contribution
+
+COLLECT_BATCH_SIZE = 50  # gameyas per transaction
+
+
+def collect_round(gameya_ids):
+    """
+    Debit the current round's contribution from every active member of the
+    given ACTIVE gameyas who has not paid it yet, in one transaction:
+    one wallet UPDATE, bulk inserts for Transaction and Contribution rows and
+    one trust-score UPDATE. Members whose balance is too low are left out and
+    returned as shortfalls.
+    """
+    with transaction.atomic():
+        gameyas = {
+            g.pk: g
+            for g in Gameya.objects.select_for_update().filter(pk__in=gameya_ids, status='ACTIVE')
+        }
+        already_paid = Contribution.objects.filter(
+            membership=OuterRef('pk'),
+            month=OuterRef('gameya__current_round'),
+        )
+        due = list(
+            Membership.objects.filter(gameya_id__in=gameyas, is_active=True)
+            .exclude(Exists(already_paid))
+            .order_by('gameya_id', 'payout_order', 'pk')
+            .values_list('pk', 'user_id', 'user__username', 'gameya_id')
+        )
+
+        wallets = {
+            w.user_id: w
+            for w in Wallet.objects.select_for_update().filter(user_id__in={user_id for _, user_id, _, _ in due})
+        }
+        available = {user_id: w.balance for user_id, w in wallets.items()}
+
+        entries, contributions, shortfalls = [], [], []
+        trust_changes = defaultdict(int)
+        for membership_id, user_id, username, gameya_id in due:
+            g = gameyas[gameya_id]
+            amount = g.contribution_amount
+            balance = available.get(user_id, Decimal('0'))
+            if user_id not in wallets or balance < amount:
+                shortfalls.append({
+                    "gameya_id": gameya_id,
+                    "round": g.current_round,
+                    "membership_id": membership_id,
+                    "username": username,
+                    "balance": balance,
+                    "required": amount,
+                })
+                continue
+
+            available[user_id] = balance - amount
+            entries.append((
+                wallets[user_id].pk,
+                amount,
+                f"GAMEYA-{gameya_id}-ROUND-{g.current_round}",
+                f"Contribution for Gameya {g.name}, month {g.current_round}",
+                {"gameya_id": gameya_id, "gameya_round": g.current_round},
+            ))
+            contributions.append(Contribution(
+                membership_id=membership_id,
+                amount=amount,
+                month=g.current_round,
+                confirmed=True,
+            ))
+            trust_changes[user_id] += 5
+
+        bulk_debit(entries, 'CONTRIBUTION')
+        Contribution.objects.bulk_create(contributions)
+        bulk_adjust_trust_scores(trust_changes)
+
+    return {
+        "collected": len(contributions),
+        "amount": sum((amount for _, amount, *_ in entries), Decimal('0')),
+        "shortfalls": shortfalls,
+    }
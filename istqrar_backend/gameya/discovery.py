@@ -0,0 +1,63 @@
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import Gameya
+
+OPEN_LISTING_TTL = 30  # seconds
+OPEN_LISTING_VERSION_KEY = 'gameya:open-listing:version'
+
+
+def open_seats():
+    return Q(max_members__isnull=True) | Q(max_members=0) | Q(total_members__lt=F('max_members'))
+
+
+def parse_amount(raw):
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError('amount')
+    # Decimal() happily parses NaN and Infinity, which the database cannot compare
+    if not value.is_finite():
+        raise ValueError('amount')
+    return value
+
+
+def discover_queryset(params):
+    """
+    Gameyas matching the discovery filters: status (default ACTIVE), open
+    (default true: only gameyas with a free seat), min_amount, max_amount and
+    duration. Raises ValueError on malformed values.
+    """
+    status = params.get('status', 'ACTIVE').upper()
+    if status not in dict(Gameya.STATUS_CHOICES):
+        raise ValueError('status')
+    queryset = Gameya.objects.select_related('creator').filter(status=status)
+
+    if params.get('open', 'true').lower() not in ('false', '0', 'no'):
+        queryset = queryset.filter(open_seats())
+    if params.get('min_amount'):
+        queryset = queryset.filter(contribution_amount__gte=parse_amount(params['min_amount']))
+    if params.get('max_amount'):
+        queryset = queryset.filter(contribution_amount__lte=parse_amount(params['max_amount']))
+    if params.get('duration'):
+        queryset = queryset.filter(duration_months=int(params['duration']))
+
+    return queryset.order_by('-created_at', '-pk')
+
+
+def is_open_listing(params):
+    """The unfiltered "open gameyas" listing is the hot path that gets cached."""
+    return set(params) <= {'page'}
+
+
+def open_listing_key(page):
+    version = cache.get_or_set(OPEN_LISTING_VERSION_KEY, time.time_ns(), None)
+    return f'gameya:open-listing:{version}:{page}'
+
+
+def invalidate_open_listing():
+    # a new version makes every cached page unreachable; they expire on their own
+    cache.set(OPEN_LISTING_VERSION_KEY, time.time_ns(), None)
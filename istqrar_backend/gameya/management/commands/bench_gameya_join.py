@@ -0,0 +1,92 @@
+import threading
+import time
+import uuid
+from queue import Queue, Empty
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gameya.models import Gameya, Membership
+from gameya.seats import join_gameya, GameyaFull
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent joins at one gameya and check seat allocation: no oversubscription, "
+        "unique payout orders, total_members matching the active memberships. "
+        "Creates throwaway users and a gameya in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--joins', type=int, default=300, help='Users trying to join.')
+        parser.add_argument('--seats', type=int, default=200, help='max_members of the gameya.')
+        parser.add_argument('--workers', type=int, default=32, help='Concurrent threads.')
+
+    def handle(self, *args, **options):
+        joins, seats, workers = options['joins'], options['seats'], options['workers']
+        User = get_user_model()
+        prefix = f"bench-join-{uuid.uuid4().hex[:8]}"
+        User.objects.bulk_create([User(username=f"{prefix}-{n}") for n in range(joins + 1)])
+        users = list(User.objects.filter(username__startswith=prefix).order_by('pk'))
+        gameya = Gameya.objects.create(
+            name=prefix,
+            creator=users[0],
+            contribution_amount=1,
+            duration_months=seats,
+            max_members=seats,
+        )
+
+        queue = Queue()
+        for user in users[1:]:
+            queue.put(user)
+        outcomes = {"joined": 0, "full": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        user = queue.get_nowait()
+                    except Empty:
+                        return
+                    try:
+                        join_gameya(user, gameya)
+                        result = "joined"
+                    except GameyaFull:
+                        result = "full"
+                    except Exception as exc:
+                        result = "errors"
+                        self.stderr.write(f"{user.username}: {exc!r}")
+                    with lock:
+                        outcomes[result] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            gameya.refresh_from_db()
+            orders = list(Membership.objects.filter(gameya=gameya, is_active=True).values_list('payout_order', flat=True))
+            checks = {
+                "not oversubscribed": len(orders) <= seats,
+                "total_members matches memberships": gameya.total_members == len(orders),
+                "payout orders unique": len(set(orders)) == len(orders),
+                "every successful join seated": outcomes["joined"] == len(orders),
+            }
+            self.stdout.write(
+                f"{joins} joins for {seats} seats with {workers} workers in {elapsed:.2f}s "
+                f"({joins / elapsed:.0f} joins/s): {outcomes}"
+            )
+            for name, ok in checks.items():
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f"  {'ok  ' if ok else 'FAIL'} {name}"))
+        finally:
+            gameya.delete()
+            User.objects.filter(username__startswith=prefix).delete()
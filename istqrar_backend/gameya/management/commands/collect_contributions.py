@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+
+from gameya.collect import COLLECT_BATCH_SIZE, collect_round
+from gameya.models import Gameya
+from wallet.services import InsufficientFunds
+
+
+class Command(BaseCommand):
+    help = "Auto-debit the current round's contribution from every active member of ACTIVE gameyas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('gameya_ids', nargs='*', type=int, help='Limit to these gameyas (default: all ACTIVE).')
+        parser.add_argument('--batch-size', type=int, default=COLLECT_BATCH_SIZE, help='Gameyas per transaction.')
+
+    def handle(self, *args, **options):
+        gameyas = Gameya.objects.filter(status='ACTIVE').order_by('pk')
+        if options['gameya_ids']:
+            gameyas = gameyas.filter(pk__in=options['gameya_ids'])
+        ids = list(gameyas.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        collected, shortfalls, failed = 0, 0, 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            try:
+                report = collect_round(batch)
+            except (InsufficientFunds, DatabaseError) as exc:
+                failed += len(batch)
+                self.stderr.write(f"gameyas {batch[0]}..{batch[-1]} failed: {exc!r}")
+                continue
+            collected += report['collected']
+            shortfalls += len(report['shortfalls'])
+            for s in report['shortfalls']:
+                self.stdout.write(
+                    f"shortfall: gameya {s['gameya_id']} round {s['round']} {s['username']} "
+                    f"has {s['balance']}, needs {s['required']}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Collected {collected} contributions from {len(ids) - failed} gameyas, "
+            f"{shortfalls} shortfalls, {failed} gameyas failed, in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from gameya.payouts import PAYOUT_BATCH_SIZE, run_payouts
+
+
+class Command(BaseCommand):
+    help = (
+        "Pay out every ACTIVE gameya whose round is due. Safe to run from several "
+        "processes at once: due gameyas are claimed with SELECT ... FOR UPDATE SKIP LOCKED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PAYOUT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=1, help='Worker threads in this process.')
+        parser.add_argument('--date', help='YYYY-MM-DD; pay rounds due on or before this date (default: today).')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError('--date must be a YYYY-MM-DD date.')
+
+        report = run_payouts(today=today, batch_size=options['batch_size'], workers=options['workers'])
+
+        for failure in report['failures']:
+            self.stderr.write(f"gameya {failure['gameya_id']} round {failure['round']}: {failure['error']}")
+        elapsed = report['elapsed']
+        rate = report['paid'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Paid {report['paid']} rounds ({report['amount']}) in {report['batches']} batches, "
+            f"{len(report['failures'])} failures, {elapsed:.2f}s ({rate:.0f} payouts/s)."
+        ))
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import Membership, Contribution
+
+# cell codes in the matrix; rounds that are not due yet are null
+MISSING, PAID, PENDING = 0, 1, 2
+CELL_CODES = {"missing": MISSING, "paid": PAID, "pending": PENDING}
+
+
+def contribution_matrix(gameya):
+    """
+    Members x rounds view of a gameya's contributions, in columnar form.
+
+    Contributions are read with a single query grouped by (membership, month);
+    `cells[i][r - 1]` is the state of member i for round r.
+    """
+    rounds = list(range(1, gameya.duration_months + 1))
+    last_due = gameya.duration_months if gameya.status == 'COMPLETED' else gameya.current_round
+
+    members = list(
+        Membership.objects.filter(gameya=gameya)
+        .order_by('payout_order', 'pk')
+        .values_list('pk', 'user__username', 'payout_order', 'is_active')
+    )
+    grouped = (
+        Contribution.objects.filter(membership__gameya=gameya, month__in=rounds)
+        .values('membership_id', 'month')
+        .annotate(
+            paid=Count('pk', filter=Q(confirmed=True)),
+            paid_amount=Sum('amount', filter=Q(confirmed=True)),
+            pending=Count('pk', filter=Q(confirmed=False)),
+        )
+        .order_by()
+    )
+    found = {(row['membership_id'], row['month']): row for row in grouped}
+
+    paid_count = [0] * len(rounds)
+    pending_count = [0] * len(rounds)
+    missing_count = [0] * len(rounds)
+    paid_amount = [Decimal('0')] * len(rounds)
+    cells = []
+    for membership_id, _, _, is_active in members:
+        row = []
+        for i, r in enumerate(rounds):
+            entry = found.get((membership_id, r))
+            if entry and entry['paid']:
+                row.append(PAID)
+                paid_count[i] += 1
+                paid_amount[i] += entry['paid_amount']
+            elif entry:
+                row.append(PENDING)
+                pending_count[i] += 1
+            elif r <= last_due and is_active:
+                row.append(MISSING)
+                missing_count[i] += 1
+            else:
+                row.append(None)
+        cells.append(row)
+
+    return {
+        "gameya_id": gameya.pk,
+        "gameya_name": gameya.name,
+        "current_round": gameya.current_round,
+        "codes": CELL_CODES,
+        "rounds": rounds,
+        "members": {
+            "membership_id": [m[0] for m in members],
+            "username": [m[1] for m in members],
+            "payout_order": [m[2] for m in members],
+            "is_active": [m[3] for m in members],
+        },
+        "cells": cells,
+        "totals": {
+            "paid": paid_count,
+            "pending": pending_count,
+            "missing": missing_count,
+            "amount": [str(a) for a in paid_amount],
+        },
+    }
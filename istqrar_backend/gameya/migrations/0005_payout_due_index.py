@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:12
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_next_payout_date(apps, schema_editor):
+    Gameya = apps.get_model('gameya', 'Gameya')
+    batch = []
+    for gameya in Gameya.objects.filter(status='ACTIVE', next_payout_date__isnull=True).iterator(chunk_size=1000):
+        gameya.next_payout_date = gameya.start_date + timedelta(days=30 * (gameya.current_round - 1))
+        batch.append(gameya)
+        if len(batch) == 1000:
+            Gameya.objects.bulk_update(batch, ['next_payout_date'])
+            batch = []
+    Gameya.objects.bulk_update(batch, ['next_payout_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0004_gameya_next_payout_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gameya',
+            index=models.Index(fields=['status', 'next_payout_date'], name='gameya_payout_due_idx'),
+        ),
+        migrations.RunPython(backfill_next_payout_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def generate_schedules(apps, schema_editor):
+    Gameya = apps.get_model('gameya', 'Gameya')
+    Membership = apps.get_model('gameya', 'Membership')
+    PayoutSchedule = apps.get_model('gameya', 'PayoutSchedule')
+
+    batch = []
+    for gameya in Gameya.objects.iterator(chunk_size=500):
+        beneficiaries = dict(
+            Membership.objects.filter(gameya=gameya, is_active=True).values_list('payout_order', 'pk')
+        )
+        for round_number in range(1, gameya.duration_months + 1):
+            paid = round_number < gameya.current_round or gameya.status == 'COMPLETED'
+            batch.append(PayoutSchedule(
+                gameya=gameya,
+                round=round_number,
+                membership_id=None if paid else beneficiaries.get(round_number),
+                due_date=gameya.start_date + timedelta(days=30 * (round_number - 1)),
+                status='PAID' if paid else 'PENDING',
+            ))
+        if len(batch) >= 1000:
+            PayoutSchedule.objects.bulk_create(batch)
+            batch = []
+    PayoutSchedule.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0005_payout_due_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PAID', 'Paid')], default='PENDING', max_length=20)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('gameya', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_schedule', to='gameya.gameya')),
+                ('membership', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduled_payouts', to='gameya.membership')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'due_date'], name='payout_schedule_due_idx')],
+                'unique_together': {('gameya', 'round')},
+            },
+        ),
+        migrations.RunPython(generate_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_payout_order(apps, schema_editor):
+    Gameya = apps.get_model('gameya', 'Gameya')
+    Membership = apps.get_model('gameya', 'Membership')
+    highest = (
+        Membership.objects.filter(gameya=OuterRef('pk'))
+        .order_by().values('gameya').annotate(m=Max('payout_order')).values('m')
+    )
+    Gameya.objects.update(last_payout_order=Coalesce(Subquery(highest), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0006_payoutschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameya',
+            name='last_payout_order',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_last_payout_order, migrations.RunPython.noop),
+    ]
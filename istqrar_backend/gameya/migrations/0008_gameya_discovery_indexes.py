@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0007_gameya_last_payout_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gameya',
+            index=models.Index(fields=['status', 'contribution_amount'], name='gameya_discover_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameya',
+            index=models.Index(fields=['status', 'duration_months'], name='gameya_discover_duration_idx'),
+        ),
+    ]
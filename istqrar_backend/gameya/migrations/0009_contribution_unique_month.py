@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_contributions(apps, schema_editor):
+    # Each duplicate was debited from a wallet, so it has to be refunded or
+    # reassigned by an operator; this migration refuses to delete money records.
+    Contribution = apps.get_model('gameya', 'Contribution')
+    duplicates = list(
+        Contribution.objects.order_by('membership_id', 'month').values_list('membership_id', 'month')
+        .annotate(n=Count('pk')).filter(n__gt=1)[:50]
+    )
+    if duplicates:
+        pairs = ', '.join(f'(membership {m}, month {month}: {n} rows)' for m, month, n in duplicates)
+        raise RuntimeError(
+            'Resolve the duplicate contributions before adding the one-per-month constraint '
+            f'(first {len(duplicates)} shown): {pairs}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0008_gameya_discovery_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_contributions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='contribution',
+            constraint=models.UniqueConstraint(fields=('membership', 'month'), name='gameya_one_contribution_per_month'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:36
+
+from itertools import count
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+
+
+def reassign_payout_orders(apps, schema_editor):
+    # Active members sharing a payout order, or stranded past duration_months,
+    # move into the rounds nobody holds; the earliest member keeps a shared order.
+    Gameya = apps.get_model('gameya', 'Gameya')
+    Membership = apps.get_model('gameya', 'Membership')
+    PayoutSchedule = apps.get_model('gameya', 'PayoutSchedule')
+
+    active = Membership.objects.filter(is_active=True)
+    shared = (
+        active.order_by().values('gameya_id', 'payout_order')
+        .annotate(n=Count('pk')).filter(n__gt=1).values('gameya_id')
+    )
+    stranded = active.filter(
+        Q(payout_order__lt=1)
+        | Q(payout_order__gt=Subquery(Gameya.objects.filter(pk=OuterRef('gameya')).values('duration_months')[:1]))
+    ).values('gameya_id')
+
+    for gameya in Gameya.objects.filter(Q(pk__in=shared) | Q(pk__in=stranded)).iterator(chunk_size=500):
+        members = list(active.filter(gameya=gameya).order_by('joined_at', 'pk'))
+        taken, misplaced = set(), []
+        for member in members:
+            if 1 <= member.payout_order <= gameya.duration_months and member.payout_order not in taken:
+                taken.add(member.payout_order)
+            else:
+                misplaced.append(member)
+
+        free = [o for o in range(gameya.current_round, gameya.duration_months + 1) if o not in taken]
+        # members beyond the last round keep distinct orders so they can be resolved by hand
+        overflow = count(gameya.duration_months + 1)
+        for member in misplaced:
+            member.payout_order = free.pop(0) if free else next(overflow)
+        Membership.objects.bulk_update(misplaced, ['payout_order'])
+
+        beneficiary = Membership.objects.filter(
+            gameya=OuterRef('gameya'),
+            payout_order=OuterRef('round'),
+            is_active=True,
+        ).values('pk')[:1]
+        PayoutSchedule.objects.filter(gameya=gameya, status='PENDING').update(membership=Subquery(beneficiary))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0009_contribution_unique_month'),
+    ]
+
+    operations = [
+        migrations.RunPython(reassign_payout_orders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='membership',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(is_active=True),
+                fields=('gameya', 'payout_order'),
+                name='gameya_one_active_member_per_order',
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0010_reassign_payout_orders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payoutschedule',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PAID', 'Paid'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -1,5 +1,7 @@
 # gameya/models.py
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.conf import settings
 from datetime import timedelta
 
@@ -18,6 +20,7 @@ class Gameya(models.Model):
     contribution_amount = models.DecimalField(max_digits=10, decimal_places=2)
     max_members = models.PositiveIntegerField(blank=True, null=True)
     total_members = models.PositiveIntegerField(default=0)
+    last_payout_order = models.PositiveIntegerField(default=0)  # highest payout_order handed out so far
     duration_months = models.PositiveIntegerField()
     current_round = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
@@ -25,9 +28,18 @@ class Gameya(models.Model):
     start_date = models.DateField(auto_now_add=True)
     next_payout_date = models.DateField(null=True, blank=True)
 
-    def get_next_payout_date(self):
-        return self.start_date + timedelta(days=30 * (self.current_round - 1))
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_payout_date'], name='gameya_payout_due_idx'),
+            models.Index(fields=['status', 'contribution_amount'], name='gameya_discover_amount_idx'),
+            models.Index(fields=['status', 'duration_months'], name='gameya_discover_duration_idx'),
+        ]
 
+    def payout_date_for_round(self, round_number):
+        return self.start_date + timedelta(days=30 * (round_number - 1))
+
+    def get_next_payout_date(self):
+        return self.payout_date_for_round(self.current_round)
 
 
     def __str__(self):
@@ -43,6 +55,13 @@ class Membership(models.Model):
 
     class Meta:
         unique_together = ('user', 'gameya') # Ensure a user can join a gameya only once
+        constraints = [
+            models.UniqueConstraint(
+                fields=['gameya', 'payout_order'],
+                condition=models.Q(is_active=True),
+                name='gameya_one_active_member_per_order',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} in {self.gameya.name}"
@@ -55,5 +74,57 @@ class Contribution(models.Model):
     paid_at = models.DateTimeField(auto_now_add=True)
     confirmed = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['membership', 'month'], name='gameya_one_contribution_per_month'),
+        ]
+
     def __str__(self):
         return f"{self.membership.user.username} - {self.amount} ({'Paid' if self.confirmed else 'Pending'})"
+
+
+class PayoutSchedule(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PAID', 'Paid'),
+        ('FAILED', 'Failed'),  # was due with no active beneficiary; reopened once the round is taken
+    ]
+    OPEN_STATUSES = ('PENDING', 'FAILED')
+
+    gameya = models.ForeignKey(Gameya, on_delete=models.CASCADE, related_name='payout_schedule')
+    round = models.PositiveIntegerField()
+    membership = models.ForeignKey(
+        Membership,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scheduled_payouts',
+    )  # beneficiary: the active member whose payout_order is this round
+    due_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)  # set when paid
+    paid_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('gameya', 'round')
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='payout_schedule_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.gameya.name} round {self.round} - {self.due_date} ({self.status})"
+
+
+@receiver(post_save, sender=Gameya)
+def schedule_gameya(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Keep the payout calendar in step with every full save, whichever path
+    wrote the gameya (API, admin, ORM or fixtures).
+    """
+    from .schedule import sync_schedule
+
+    if created and instance.next_payout_date is None and instance.status == 'ACTIVE':
+        instance.next_payout_date = instance.get_next_payout_date()
+        Gameya.objects.filter(pk=instance.pk).update(next_payout_date=instance.next_payout_date)
+    if created or update_fields is None:
+        sync_schedule(instance)
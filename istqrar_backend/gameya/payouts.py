@@ -0,0 +1,145 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from wallet.services import ensure_wallets, bulk_credit
+from .models import Gameya, Membership, PayoutSchedule
+from .discovery import invalidate_open_listing
+
+PAYOUT_BATCH_SIZE = 100
+
+
+def due_payouts(today):
+    """Pending calendar rows for the current round of ACTIVE gameyas, due on or before `today`."""
+    return PayoutSchedule.objects.filter(
+        status='PENDING',
+        due_date__lte=today,
+        gameya__status='ACTIVE',
+        round=F('gameya__current_round'),
+    )
+
+
+def pay_out_batch(today, batch_size=PAYOUT_BATCH_SIZE, skip_ids=()):
+    """
+    Claim up to `batch_size` due payouts from the schedule and pay them in one
+    transaction. Rows locked by another worker are skipped, so several workers
+    can drain the queue in parallel. Rows without an active beneficiary are
+    marked FAILED. Returns (paid, failures), or None when nothing is due.
+    """
+    active_members = (
+        Membership.objects.filter(gameya=OuterRef('gameya'), is_active=True)
+        .order_by().values('gameya').annotate(n=Count('pk')).values('n')
+    )
+
+    with transaction.atomic():
+        claimed = list(
+            due_payouts(today)
+            .exclude(pk__in=skip_ids)
+            .select_related('gameya', 'membership')
+            .select_for_update(skip_locked=True, of=('self', 'gameya'))
+            .annotate(active_members=Coalesce(Subquery(active_members), 0))
+            .order_by('due_date', 'pk')[:batch_size]
+        )
+        if not claimed:
+            return None
+
+        wallets = ensure_wallets(row.membership.user_id for row in claimed if row.membership)
+        entries, advanced, settled, unpaid, paid, failures = [], [], [], [], [], []
+        now = timezone.now()
+        for row in claimed:
+            g = row.gameya
+            if not row.membership or not row.membership.is_active:
+                failures.append({
+                    "schedule_id": row.pk,
+                    "gameya_id": g.pk,
+                    "round": row.round,
+                    "error": "No active member found for the current payout order.",
+                })
+                unpaid.append(row.pk)
+                continue
+
+            pot = g.contribution_amount * Decimal(row.active_members)
+            entries.append((
+                wallets[row.membership.user_id],
+                pot,
+                f"GAMEYA-{g.pk}-ROUND-{row.round}",
+                f"Payout for Gameya {g.name}, round {row.round}",
+                {"gameya_id": g.pk, "gameya_round": row.round},
+            ))
+            paid.append({"gameya_id": g.pk, "round": row.round, "amount": pot})
+
+            row.status = 'PAID'
+            row.amount = pot
+            row.paid_at = now
+            settled.append(row)
+
+            # move to next round or complete
+            if g.current_round >= g.duration_months:
+                g.status = 'COMPLETED'
+                g.next_payout_date = None
+            else:
+                g.current_round += 1
+                g.next_payout_date = g.payout_date_for_round(g.current_round)
+            advanced.append(g)
+
+        bulk_credit(entries, 'PAYOUT')
+        PayoutSchedule.objects.bulk_update(settled, ['status', 'amount', 'paid_at'])
+        PayoutSchedule.objects.filter(pk__in=unpaid).update(status='FAILED')
+        Gameya.objects.bulk_update(advanced, ['current_round', 'status', 'next_payout_date'])
+
+    return paid, failures
+
+
+def run_payouts(today=None, batch_size=PAYOUT_BATCH_SIZE, workers=1):
+    """Pay every due round, using `workers` threads. Returns a summary report."""
+    today = today or timezone.localdate()
+    report = {"paid": 0, "amount": Decimal('0'), "batches": 0, "failures": []}
+    failed_ids = set()
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    if workers <= 1:
+        _drain(today, batch_size, report, failed_ids, lock)
+    else:
+        def worker():
+            try:
+                _drain(today, batch_size, report, failed_ids, lock)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    report["elapsed"] = time.perf_counter() - started
+    if report["paid"]:
+        invalidate_open_listing()
+    return report
+
+
+def _drain(today, batch_size, report, failed_ids, lock):
+    while True:
+        with lock:
+            skip = set(failed_ids)
+        try:
+            result = pay_out_batch(today, batch_size, skip)
+        except DatabaseError as exc:
+            with lock:
+                report["failures"].append({"schedule_id": None, "gameya_id": None, "round": None, "error": f"Batch failed: {exc}"})
+            return
+        if result is None:
+            return
+
+        paid, failures = result
+        with lock:
+            report["batches"] += 1
+            report["paid"] += len(paid)
+            report["amount"] += sum((p["amount"] for p in paid), Decimal('0'))
+            report["failures"].extend(failures)
+            failed_ids.update(f["schedule_id"] for f in failures)
@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Membership, PayoutSchedule
+
+
+def sync_schedule(gameya):
+    """
+    Make the payout calendar of `gameya` match its duration: create the missing
+    rounds, drop pending rounds past the end, and refresh the beneficiaries.
+    Rounds before the current one are recorded as already paid.
+    """
+    with transaction.atomic():
+        existing = set(gameya.payout_schedule.values_list('round', flat=True))
+        PayoutSchedule.objects.bulk_create(
+            [
+                PayoutSchedule(
+                    gameya=gameya,
+                    round=round_number,
+                    due_date=gameya.payout_date_for_round(round_number),
+                    status='PAID' if round_number < gameya.current_round or gameya.status == 'COMPLETED' else 'PENDING',
+                )
+                for round_number in range(1, gameya.duration_months + 1)
+                if round_number not in existing
+            ],
+            ignore_conflicts=True,
+        )
+        gameya.payout_schedule.filter(
+            status__in=PayoutSchedule.OPEN_STATUSES, round__gt=gameya.duration_months,
+        ).delete()
+        sync_beneficiaries(gameya)
+
+
+def sync_beneficiaries(gameya):
+    """
+    Point every open round at the active member holding that payout order, and
+    reopen failed rounds that have a beneficiary again.
+    """
+    beneficiary = Membership.objects.filter(
+        gameya=OuterRef('gameya'),
+        payout_order=OuterRef('round'),
+        is_active=True,
+    ).values('pk')[:1]
+    gameya.payout_schedule.filter(status__in=PayoutSchedule.OPEN_STATUSES).update(membership=Subquery(beneficiary))
+    gameya.payout_schedule.filter(status='FAILED', membership__isnull=False).update(status='PENDING')
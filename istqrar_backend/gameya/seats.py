@@ -0,0 +1,86 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import Gameya, Membership
+from .schedule import sync_beneficiaries
+
+
+class GameyaFull(Exception):
+    pass
+
+
+class AlreadyMember(Exception):
+    pass
+
+
+class NotMember(Exception):
+    pass
+
+
+def free_payout_order(gameya):
+    """
+    Lowest round from the current one up to duration_months that no active
+    member holds, so seats given up by leavers are filled before any later one.
+    None when every remaining round is taken.
+    """
+    taken = set(
+        Membership.objects.filter(gameya=gameya, is_active=True).values_list('payout_order', flat=True)
+    )
+    current_round, duration = Gameya.objects.values_list('current_round', 'duration_months').get(pk=gameya.pk)
+    return next((order for order in range(current_round, duration + 1) if order not in taken), None)
+
+
+def join_gameya(user, gameya):
+    """
+    Claim a seat with one conditional UPDATE, then give the member the lowest
+    free payout order and create (or reactivate) the membership in the same
+    transaction. The UPDATE write-locks the gameya row, so concurrent joins can
+    neither oversubscribe the gameya nor share an order.
+    """
+    with transaction.atomic():
+        claimed = Gameya.objects.filter(pk=gameya.pk).filter(
+            Q(max_members__isnull=True) | Q(max_members=0) | Q(total_members__lt=F('max_members'))
+        ).update(total_members=F('total_members') + 1)
+        if not claimed:
+            raise GameyaFull()
+
+        if Membership.objects.filter(user=user, gameya=gameya, is_active=True).exists():
+            raise AlreadyMember()
+        payout_order = free_payout_order(gameya)
+        if payout_order is None:
+            raise GameyaFull()
+        Gameya.objects.filter(pk=gameya.pk, last_payout_order__lt=payout_order).update(
+            last_payout_order=payout_order
+        )
+
+        membership = Membership.objects.filter(user=user, gameya=gameya).first()
+        if membership is None:
+            try:
+                with transaction.atomic():
+                    membership = Membership.objects.create(
+                        user=user,
+                        gameya=gameya,
+                        is_active=True,
+                        payout_order=payout_order,
+                    )
+            except IntegrityError:
+                raise AlreadyMember()
+        else:
+            if not Membership.objects.filter(pk=membership.pk, is_active=False).update(
+                is_active=True,
+                payout_order=payout_order,
+            ):
+                raise AlreadyMember()
+            membership.is_active = True
+            membership.payout_order = payout_order
+
+        sync_beneficiaries(gameya)
+    return membership
+
+
+def leave_gameya(user, gameya):
+    with transaction.atomic():
+        if not Membership.objects.filter(user=user, gameya=gameya, is_active=True).update(is_active=False):
+            raise NotMember()
+        Gameya.objects.filter(pk=gameya.pk, total_members__gt=0).update(total_members=F('total_members') - 1)
+        sync_beneficiaries(gameya)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Gameya, Membership, Contribution
+from .models import Gameya, Membership, Contribution, PayoutSchedule
 
 class GameyaSerializer(serializers.ModelSerializer):
     creator_username = serializers.CharField(source='creator.username', read_only=True)
@@ -7,7 +7,7 @@ class GameyaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Gameya
         fields = '__all__'
-        read_only_fields = ['id', 'creator', 'creator_username', 'total_members', 'current_round', 'created_at']
+        read_only_fields = ['id', 'creator', 'creator_username', 'total_members', 'current_round', 'created_at', 'next_payout_date', 'last_payout_order']
 
 
 
@@ -45,3 +45,23 @@ class ContributionSerializer(serializers.ModelSerializer):
             'paid_at',
             'confirmed',
         ]
+
+
+class PayoutScheduleSerializer(serializers.ModelSerializer):
+    gameya_name = serializers.CharField(source='gameya.name', read_only=True)
+    beneficiary_username = serializers.CharField(source='membership.user.username', read_only=True, default=None)
+
+    class Meta:
+        model = PayoutSchedule
+        fields = [
+            'id',
+            'gameya',
+            'gameya_name',
+            'round',
+            'membership',
+            'beneficiary_username',
+            'due_date',
+            'status',
+            'amount',
+            'paid_at',
+        ]
@@ -1,3 +1,474 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from wallet.models import Wallet, Transaction
+from .collect import collect_round
+from .forecasting import forecast, load_portfolio
+from .models import Gameya, Membership, Contribution
+from .payouts import run_payouts
+from .seats import join_gameya, leave_gameya, GameyaFull
+
+User = get_user_model()
+
+
+class MyGameyasQueryCountTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.user = User.objects.create(username='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def join(self, count):
+        for n in range(count):
+            gameya = Gameya.objects.create(
+                name=f'Gameya {n}',
+                creator=self.creator,
+                contribution_amount=100,
+                duration_months=6,
+            )
+            membership = Membership.objects.create(user=self.user, gameya=gameya, payout_order=1)
+            if n % 2:
+                Contribution.objects.create(membership=membership, amount=100, month=1, confirmed=True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_my_gameyas_query_count_is_constant(self):
+        self.join(1)
+        few, _ = self.count_queries('/api/gameyas/my_gameyas/')
+        self.join(7)
+        many, data = self.count_queries('/api/gameyas/my_gameyas/')
+
+        self.assertEqual(few, many)
+        self.assertEqual(data['count'], 8)
+        self.assertEqual(sum(row['contributed_this_month'] for row in data['results']), 3)
+
+    def test_active_query_count_is_constant(self):
+        self.join(1)
+        few, _ = self.count_queries('/api/gameyas/active/')
+        self.join(7)
+        many, data = self.count_queries('/api/gameyas/active/')
+
+        self.assertEqual(few, many)
+        self.assertEqual(data['count'], 8)
+
+
+class CollectRoundTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.gameya = Gameya.objects.create(
+            name='Circle',
+            creator=self.creator,
+            contribution_amount=100,
+            duration_months=3,
+        )
+        self.rich = User.objects.create(username='rich')
+        self.poor = User.objects.create(username='poor')
+        Wallet.objects.create(user=self.rich, balance=Decimal('250.00'))
+        Wallet.objects.create(user=self.poor, balance=Decimal('40.00'))
+        for order, user in enumerate((self.rich, self.poor), start=1):
+            Membership.objects.create(user=user, gameya=self.gameya, payout_order=order)
+        self.client = APIClient()
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_collect_reports_shortfalls_and_never_charges_twice(self):
+        report = collect_round([self.gameya.pk])
+
+        self.assertEqual(report['collected'], 1)
+        self.assertEqual(report['amount'], Decimal('100'))
+        self.assertEqual([s['username'] for s in report['shortfalls']], ['poor'])
+        self.assertEqual(self.balance(self.rich), Decimal('150.00'))
+        self.assertEqual(self.balance(self.poor), Decimal('40.00'))
+
+        again = collect_round([self.gameya.pk])
+        self.assertEqual(again['collected'], 0)
+        self.assertEqual(self.balance(self.rich), Decimal('150.00'))
+
+        self.client.force_authenticate(self.rich)
+        response = self.client.post(f'/api/gameyas/{self.gameya.pk}/contribute/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.rich), Decimal('150.00'))
+        self.assertEqual(Contribution.objects.filter(membership__user=self.rich).count(), 1)
+
+    def test_collect_skips_members_who_contributed(self):
+        self.client.force_authenticate(self.rich)
+        response = self.client.post(f'/api/gameyas/{self.gameya.pk}/contribute/', {}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        report = collect_round([self.gameya.pk])
+        self.assertEqual(report['collected'], 0)
+        self.assertEqual(self.balance(self.rich), Decimal('150.00'))
+
+    def test_one_contribution_per_member_and_month(self):
+        membership = Membership.objects.get(user=self.rich)
+        Contribution.objects.create(membership=membership, amount=100, month=1, confirmed=True)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Contribution.objects.create(membership=membership, amount=100, month=1, confirmed=True)
+
+
+class PayoutOrderTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.gameya = Gameya.objects.create(
+            name='Circle',
+            creator=self.creator,
+            contribution_amount=100,
+            duration_months=3,
+        )
+        self.users = [User.objects.create(username=f'user{n}') for n in range(4)]
+
+    def beneficiaries(self):
+        return list(
+            self.gameya.payout_schedule.order_by('round').values_list('membership__user__username', flat=True)
+        )
+
+    def test_orders_stay_within_duration(self):
+        for user in self.users[:3]:
+            join_gameya(user, self.gameya)
+        self.assertEqual(self.beneficiaries(), ['user0', 'user1', 'user2'])
+
+        with self.assertRaises(GameyaFull):
+            join_gameya(self.users[3], self.gameya)
+        self.gameya.refresh_from_db()
+        self.assertEqual(self.gameya.total_members, 3)
+
+    def test_leave_then_rejoin_fills_the_free_round(self):
+        for user in self.users[:3]:
+            join_gameya(user, self.gameya)
+        leave_gameya(self.users[1], self.gameya)
+        self.assertEqual(self.beneficiaries(), ['user0', None, 'user2'])
+
+        membership = join_gameya(self.users[3], self.gameya)
+        self.assertEqual(membership.payout_order, 2)
+        self.assertEqual(self.beneficiaries(), ['user0', 'user3', 'user2'])
+
+        leave_gameya(self.users[0], self.gameya)
+        rejoined = join_gameya(self.users[1], self.gameya)
+        self.assertEqual(rejoined.payout_order, 1)
+        self.assertEqual(self.beneficiaries(), ['user1', 'user3', 'user2'])
+
+    def test_paid_rounds_are_not_handed_out_again(self):
+        for user in self.users[:3]:
+            join_gameya(user, self.gameya)
+        Gameya.objects.filter(pk=self.gameya.pk).update(current_round=2)
+        leave_gameya(self.users[0], self.gameya)
+
+        with self.assertRaises(GameyaFull):
+            join_gameya(self.users[3], self.gameya)
+
+    def test_one_active_member_per_order(self):
+        join_gameya(self.users[0], self.gameya)
+        leave_gameya(self.users[0], self.gameya)
+        Membership.objects.create(user=self.users[1], gameya=self.gameya, payout_order=1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Membership.objects.create(user=self.users[2], gameya=self.gameya, payout_order=1)
+
+
+class PayoutViewTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator', is_superuser=True)
+        self.member = User.objects.create(username='member')
+        self.gameya = Gameya.objects.create(
+            name='Single', creator=self.creator, contribution_amount=100, duration_months=1,
+        )
+        Membership.objects.create(user=self.member, gameya=self.gameya, payout_order=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.creator)
+
+    def test_final_round_is_paid_out_once(self):
+        url = f'/api/gameyas/{self.gameya.pk}/payout/'
+        first = self.client.post(url)
+        second = self.client.post(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 409)
+        self.gameya.refresh_from_db()
+        self.assertEqual(self.gameya.status, 'COMPLETED')
+        self.assertEqual(Wallet.objects.get(user=self.member).balance, Decimal('100.00'))
+        self.assertEqual(Transaction.objects.filter(transaction_type='PAYOUT').count(), 1)
+
+
+class RunPayoutsTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.members = [User.objects.create(username=f'member{n}') for n in range(2)]
+        self.today = timezone.localdate()
+
+    def gameya(self, duration, members=()):
+        gameya = Gameya.objects.create(
+            name=f'Circle {duration}', creator=self.creator, contribution_amount=100, duration_months=duration,
+        )
+        for user in members:
+            join_gameya(user, gameya)
+        gameya.refresh_from_db()
+        return gameya
+
+    def test_pays_due_rounds_and_advances(self):
+        gameya = self.gameya(3, self.members)
+
+        report = run_payouts(today=self.today)
+
+        self.assertEqual((report['paid'], report['amount'], report['failures']), (1, Decimal('200'), []))
+        gameya.refresh_from_db()
+        self.assertEqual((gameya.current_round, gameya.status), (2, 'ACTIVE'))
+        self.assertEqual(gameya.next_payout_date, gameya.payout_date_for_round(2))
+        row = gameya.payout_schedule.get(round=1)
+        self.assertEqual((row.status, row.amount), ('PAID', Decimal('200.00')))
+        self.assertEqual(Wallet.objects.get(user=self.members[0]).balance, Decimal('200.00'))
+
+        self.assertEqual(run_payouts(today=self.today)['paid'], 0)
+        self.assertEqual(Transaction.objects.filter(transaction_type='PAYOUT').count(), 1)
+
+    def test_final_round_completes_the_gameya(self):
+        gameya = self.gameya(1, self.members[:1])
+
+        self.assertEqual(run_payouts(today=self.today)['paid'], 1)
+        gameya.refresh_from_db()
+        self.assertEqual((gameya.status, gameya.current_round, gameya.next_payout_date), ('COMPLETED', 1, None))
+        self.assertEqual(run_payouts(today=self.today)['paid'], 0)
+
+    def test_round_without_beneficiary_fails_until_taken(self):
+        gameya = self.gameya(2, self.members)
+        leave_gameya(self.members[0], gameya)
+
+        report = run_payouts(today=self.today)
+        self.assertEqual(report['paid'], 0)
+        self.assertEqual([f['round'] for f in report['failures']], [1])
+        self.assertEqual(gameya.payout_schedule.get(round=1).status, 'FAILED')
+        self.assertEqual(run_payouts(today=self.today)['failures'], [])
+        gameya.refresh_from_db()
+        self.assertEqual(gameya.current_round, 1)
+
+        join_gameya(self.members[0], gameya)
+        self.assertEqual(gameya.payout_schedule.get(round=1).status, 'PENDING')
+        self.assertEqual(run_payouts(today=self.today)['paid'], 1)
+
+
+class PayoutScheduleTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+
+    def rounds(self, gameya):
+        return list(gameya.payout_schedule.order_by('round').values_list('round', 'due_date', 'status'))
+
+    def test_gameya_created_outside_the_api_is_scheduled(self):
+        gameya = Gameya.objects.create(
+            name='ORM', creator=self.admin, contribution_amount=100, duration_months=3,
+        )
+
+        self.assertEqual(gameya.next_payout_date, gameya.start_date)
+        self.assertEqual(Gameya.objects.get(pk=gameya.pk).next_payout_date, gameya.start_date)
+        self.assertEqual(self.rounds(gameya), [
+            (n, gameya.payout_date_for_round(n), 'PENDING') for n in (1, 2, 3)
+        ])
+        self.assertEqual(run_payouts(today=gameya.start_date)['failures'][0]['round'], 1)
+
+        gameya.duration_months = 2
+        gameya.save()
+        self.assertEqual(len(self.rounds(gameya)), 2)
+
+    def test_gameya_added_in_the_admin_is_scheduled(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/gameya/gameya/add/', {
+            'name': 'Admin',
+            'creator': self.admin.pk,
+            'contribution_amount': '50',
+            'duration_months': 4,
+            'total_members': 0,
+            'last_payout_order': 0,
+            'current_round': 1,
+            'status': 'ACTIVE',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        gameya = Gameya.objects.get(name='Admin')
+        self.assertEqual(len(self.rounds(gameya)), 4)
+        self.assertIsNotNone(gameya.next_payout_date)
+
+
+class DiscoverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create(username='creator')
+        self.user = User.objects.create(username='member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.small = Gameya.objects.create(
+            name='Small', creator=self.creator, contribution_amount=50, duration_months=2, max_members=1,
+        )
+        self.big = Gameya.objects.create(
+            name='Big', creator=self.creator, contribution_amount=500, duration_months=6,
+        )
+        Gameya.objects.create(
+            name='Full', creator=self.creator, contribution_amount=100, duration_months=2,
+            max_members=1, total_members=1,
+        )
+        Gameya.objects.create(
+            name='Done', creator=self.creator, contribution_amount=100, duration_months=2, status='COMPLETED',
+        )
+
+    def names(self, query=''):
+        response = self.client.get(f'/api/gameyas/discover/{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(gameya['name'] for gameya in response.data['results'])
+
+    def test_filters(self):
+        self.assertEqual(self.names(), ['Big', 'Small'])
+        self.assertEqual(self.names('?min_amount=100'), ['Big'])
+        self.assertEqual(self.names('?max_amount=100'), ['Small'])
+        self.assertEqual(self.names('?duration=6'), ['Big'])
+        self.assertEqual(self.names('?open=false'), ['Big', 'Full', 'Small'])
+        self.assertEqual(self.names('?status=completed'), ['Done'])
+
+    def test_malformed_filters_are_rejected(self):
+        for query in ('min_amount=NaN', 'max_amount=Infinity', 'min_amount=-inf', 'max_amount=abc',
+                      'duration=six', 'status=bogus'):
+            response = self.client.get(f'/api/gameyas/discover/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_cached_listing_follows_join_leave_and_payout(self):
+        self.assertEqual(self.names(), ['Big', 'Small'])
+
+        self.client.post(f'/api/gameyas/{self.small.pk}/join/')
+        self.assertEqual(self.names(), ['Big'])
+
+        self.client.post(f'/api/gameyas/{self.small.pk}/leave/')
+        self.assertEqual(self.names(), ['Big', 'Small'])
+
+        Gameya.objects.filter(pk=self.big.pk).update(duration_months=1)
+        self.client.post(f'/api/gameyas/{self.big.pk}/join/')
+        self.assertEqual(self.names(), ['Big', 'Small'])
+        self.client.force_authenticate(self.creator)
+        self.assertEqual(self.client.post(f'/api/gameyas/{self.big.pk}/payout/').status_code, 200)
+        self.assertEqual(self.names(), ['Small'])
+
+
+class ContributionMatrixTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.gameya = Gameya.objects.create(
+            name='Circle', creator=self.creator, contribution_amount=100, duration_months=3, current_round=2,
+        )
+        self.members = [
+            Membership.objects.create(user=User.objects.create(username=name), gameya=self.gameya, payout_order=order)
+            for order, name in enumerate(('alice', 'bob', 'carol'), start=1)
+        ]
+        Membership.objects.filter(pk=self.members[2].pk).update(is_active=False)
+        alice, bob, _ = self.members
+        Contribution.objects.create(membership=alice, amount=100, month=1, confirmed=True)
+        Contribution.objects.create(membership=alice, amount=100, month=2, confirmed=False)
+        Contribution.objects.create(membership=bob, amount=100, month=2, confirmed=True)
+        self.client = APIClient()
+        self.url = f'/api/gameyas/{self.gameya.pk}/contribution_matrix/'
+
+    def test_cells_and_totals(self):
+        self.client.force_authenticate(self.creator)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['members']['username'], ['alice', 'bob', 'carol'])
+        self.assertEqual(response.data['cells'], [[1, 2, None], [0, 1, None], [None, None, None]])
+        totals = response.data['totals']
+        self.assertEqual((totals['paid'], totals['pending'], totals['missing']), ([1, 1, 0], [0, 1, 0], [1, 0, 0]))
+        self.assertEqual([Decimal(a) for a in totals['amount']], [100, 100, 0])
+
+    def test_only_the_creator_sees_the_matrix(self):
+        self.client.force_authenticate(self.members[0].user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class GameyaFlowsTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        self.gameya = Gameya.objects.create(
+            name='Circle', creator=self.creator, contribution_amount=100, duration_months=2,
+        )
+        self.members = [User.objects.create(username=name) for name in ('alice', 'bob')]
+        for order, user in enumerate(self.members, start=1):
+            Wallet.objects.create(user=user, balance=Decimal('500.00'))
+            Membership.objects.create(user=user, gameya=self.gameya, payout_order=order)
+        self.client = APIClient()
+
+    def flows(self, query=''):
+        return self.client.get(f'/api/gameyas/{self.gameya.pk}/flows/{query}')
+
+    def test_flows_are_linked_to_their_round(self):
+        for user in self.members:
+            self.client.force_authenticate(user)
+            self.client.post(f'/api/gameyas/{self.gameya.pk}/contribute/', {}, format='json')
+        self.client.force_authenticate(self.creator)
+        self.assertEqual(self.client.post(f'/api/gameyas/{self.gameya.pk}/payout/').status_code, 200)
+
+        response = self.flows('?round=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(t['transaction_type'] for t in response.data['results']),
+            ['CONTRIBUTION', 'CONTRIBUTION', 'PAYOUT'],
+        )
+        self.assertEqual({(t['gameya'], t['gameya_round']) for t in response.data['results']}, {(self.gameya.pk, 1)})
+        self.assertEqual(self.flows('?round=2').data['count'], 0)
+        self.assertEqual(self.flows('?round=two').status_code, 400)
+
+    def test_only_the_creator_sees_the_flows(self):
+        self.client.force_authenticate(self.members[0])
+        self.assertEqual(self.flows().status_code, 403)
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='creator')
+        users = [User.objects.create(username=f'user{n}') for n in range(6)]
+        # two rounds left, the overdue one half collected
+        first = Gameya.objects.create(
+            name='First', creator=self.creator, contribution_amount=100, duration_months=3,
+            current_round=2, next_payout_date=date(2026, 3, 1),
+        )
+        members = [Membership.objects.create(user=user, gameya=first, payout_order=n) for n, user in enumerate(users[:2], 1)]
+        Membership.objects.create(user=users[2], gameya=first, payout_order=3, is_active=False)
+        Contribution.objects.create(membership=members[0], amount=100, month=1, confirmed=True)
+        Contribution.objects.create(membership=members[0], amount=100, month=2, confirmed=True)
+        Contribution.objects.create(membership=members[1], amount=100, month=2, confirmed=False)
+        # starts paying out in May
+        second = Gameya.objects.create(
+            name='Second', creator=self.creator, contribution_amount=50, duration_months=2,
+            next_payout_date=date(2026, 5, 10),
+        )
+        for n, user in enumerate(users[3:], 1):
+            Membership.objects.create(user=user, gameya=second, payout_order=n)
+        Gameya.objects.create(name='Done', creator=self.creator, contribution_amount=100, duration_months=2, status='COMPLETED')
+
+    def test_forecast(self):
+        today = date(2026, 3, 15)
+        result = forecast(load_portfolio(today), today=today, months=4)
+
+        self.assertEqual(result['months'], ['2026-03', '2026-04', '2026-05', '2026-06'])
+        self.assertEqual(result['active_gameyas'], [2, 2, 1, 1])
+        self.assertEqual(result['payouts'], [1, 1, 1, 1])
+        self.assertEqual(result['completing'], [0, 1, 0, 1])
+        self.assertEqual(result['inflow'], [100.0, 200.0, 150.0, 150.0])
+        self.assertEqual(result['outflow'], [200.0, 200.0, 150.0, 150.0])
+        self.assertEqual(result['float'], [200.0, 200.0, 150.0, 150.0])
+        self.assertEqual(result['totals'], {
+            'gameyas': 2, 'members': 5, 'opening_float': 100.0,
+            'inflow': 600.0, 'outflow': 700.0, 'peak_float': 200.0,
+        })
 
-# Create your tests here.
+    def test_empty_portfolio(self):
+        Gameya.objects.filter(status='ACTIVE').update(status='COMPLETED')
+        result = forecast(load_portfolio(), months=3)
+        self.assertEqual(result['inflow'], [0.0, 0.0, 0.0])
+        self.assertEqual(result['totals']['gameyas'], 0)
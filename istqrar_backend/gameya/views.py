@@ -3,11 +3,20 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from decimal import Decimal
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
 from users.utils import update_trust_score
-from .models import Gameya, Membership, Contribution
-from .serializers import GameyaSerializer, MembershipSerializer, ContributionSerializer
-from wallet.models import Wallet, Transaction
+from .models import Gameya, Membership, Contribution, PayoutSchedule
+from .serializers import GameyaSerializer, MembershipSerializer, ContributionSerializer, PayoutScheduleSerializer
+from wallet.services import get_wallet, credit, debit, InsufficientFunds
+from wallet.serializers import TransactionSerializer
+from wallet.idempotency import idempotent
+from .collect import collect_round
+from .matrix import contribution_matrix
+from .forecasting import FORECAST_CACHE_KEY, FORECAST_CACHE_TTL, MAX_FORECAST_MONTHS, forecast, load_portfolio
+from .discovery import discover_queryset, is_open_listing, open_listing_key, invalidate_open_listing, OPEN_LISTING_TTL
+from django.core.cache import cache
+from .seats import join_gameya, leave_gameya, GameyaFull, AlreadyMember, NotMember
 from django.utils import timezone
 # Create your views here.
 
@@ -18,7 +27,7 @@ class IsCreatorOrReadOnly(permissions.BasePermission):
         return obj.creator == request.user or request.user.is_superuser
 
 class GameyaViewSet(viewsets.ModelViewSet):
-    queryset=Gameya.objects.all().order_by('-created_at')
+    queryset=Gameya.objects.select_related('creator').order_by('-created_at')
     serializer_class=GameyaSerializer
     permission_classes= [permissions.IsAuthenticated]
     
@@ -28,33 +37,78 @@ class GameyaViewSet(viewsets.ModelViewSet):
             raise PermissionError("Only admins can create a Gameya.")
 
         # If allowed, create normally
+        # the post_save handler sets next_payout_date and builds the payout schedule
         serializer.save(
             creator=self.request.user,
             total_members=0,
             current_round=1
         )
+        invalidate_open_listing()
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_open_listing()
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def discover(self, request):
+        """
+        Browse gameyas to join. Filters: open (default true), status (default ACTIVE),
+        min_amount, max_amount, duration. The unfiltered listing is served from a short-lived cache.
+        """
+        params = request.query_params
+        cache_key = None
+        if is_open_listing(params):
+            cache_key = open_listing_key(params.get('page', '1'))
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+
+        try:
+            gameyas = discover_queryset(params)
+        except ValueError:
+            return Response(
+                {"detail": "Invalid filter. Use numeric amounts/duration and a valid status."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        page = self.paginate_queryset(gameyas)
+        response = self.get_paginated_response(GameyaSerializer(page, many=True).data)
+        if cache_key:
+            cache.set(cache_key, response.data, OPEN_LISTING_TTL)
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def forecast(self, request):
+        """Portfolio cash-flow projection for the next ?months= (default 24), cached for a few minutes."""
+        try:
+            months = int(request.query_params.get('months', 24))
+        except ValueError:
+            months = 0
+        if not 1 <= months <= MAX_FORECAST_MONTHS:
+            return Response(
+                {"detail": f"months must be between 1 and {MAX_FORECAST_MONTHS}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key = FORECAST_CACHE_KEY.format(months=months)
+        result = cache.get(key)
+        if result is None:
+            result = forecast(load_portfolio(), months=months)
+            result["generated_at"] = timezone.now()
+            cache.set(key, result, FORECAST_CACHE_TTL)
+        return Response(result)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def join(self, request, pk=None):
         gameya = self.get_object()
 
-        if gameya.max_members and gameya.total_members >= gameya.max_members:
+        try:
+            membership = join_gameya(request.user, gameya)
+            invalidate_open_listing()
+        except GameyaFull:
             return Response({'detail': 'This Gameya is full.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        membership, created = Membership.objects.get_or_create(
-            user=request.user,
-            gameya=gameya,
-            defaults={'is_active': True,
-                      'payout_order': gameya.total_members + 1}
-        )
-        if not created and membership.is_active:
+        except AlreadyMember:
             return Response({'detail': 'You have already joined this Gameya.'}, status=status.HTTP_400_BAD_REQUEST)
-        if not created:
-            membership.is_active = True
-            membership.save()
-
-        gameya.total_members = gameya.memberships.filter(is_active=True).count()
-        gameya.save()
 
         return Response(
             MembershipSerializer(membership).data,
@@ -64,85 +118,15 @@ class GameyaViewSet(viewsets.ModelViewSet):
     def leave(self,request,pk=None):
         gameya=self.get_object()
         try:
-            membership=Membership.objects.get(user=request.user,gameya=gameya,is_active=True)
-        except Membership.DoesNotExist:
+            leave_gameya(request.user, gameya)
+            invalidate_open_listing()
+        except NotMember:
             return Response({'detail':'You are not an active member of this Gameya.'},status=status.HTTP_400_BAD_REQUEST)
-        membership.is_active=False
-        membership.save()
-        gameya.total_members=gameya.memberships.filter(is_active=True).count()
-        gameya.save()
         update_trust_score(request.user, -10)
         return Response({'detail':'You have left the Gameya.'},status=status.HTTP_200_OK)
     
-        @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
-        def contribute(self, request, pk=None):
-            gameya = self.get_object()
-
-            # Check active membership
-            try:
-                membership = Membership.objects.get(user=request.user, gameya=gameya, is_active=True)
-            except Membership.DoesNotExist:
-                return Response(
-                    {"detail": "You are not an active member of this Gameya."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            wallet, _ = Wallet.objects.get_or_create(user=request.user)
-
-            amount = gameya.contribution_amount
-            month = request.data.get("month", gameya.current_round)
-
-            # Prevent duplicate contribution
-            if Contribution.objects.filter(
-                membership=membership,
-                month=month,
-                confirmed=True
-            ).exists():
-                return Response(
-                    {"detail": "You have already contributed for this month."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Check wallet balance
-            if wallet.balance < amount:
-                return Response(
-                    {"detail": "Insufficient wallet balance."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Atomic transaction block
-            with transaction.atomic():
-
-                # Deduct funds
-                wallet.balance = wallet.balance - amount
-                wallet.save()
-
-                # Log transaction
-                Transaction.objects.create(
-                    wallet=wallet,
-                    transaction_type="CONTRIBUTION",
-                    amount=amount,
-                    reference_id=f"GAMEYA-{gameya.id}-ROUND-{month}",
-                    description=f"Contribution for Gameya {gameya.name}, month {month}",
-                )
-
-                # Create contribution record
-                contribution = Contribution.objects.create(
-                    membership=membership,
-                    amount=amount,
-                    month=month,
-                    confirmed=True,
-                )
-
-            # Increase trust score for successful payment
-            update_trust_score(request.user, +5)
-
-            return Response(
-                ContributionSerializer(contribution).data,
-                status=status.HTTP_201_CREATED
-            )
-
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def payout(self, request, pk=None):
         gameya = self.get_object()
         if gameya.creator != request.user and not request.user.is_superuser:
@@ -150,6 +134,11 @@ class GameyaViewSet(viewsets.ModelViewSet):
                 {"detail": "Only the Gameya creator or admin can trigger payout."},
                 status=status.HTTP_403_FORBIDDEN,
             )
+        if gameya.status != 'ACTIVE':
+            return Response(
+                {"detail": "This Gameya is not active; nothing is left to pay out."},
+                status=status.HTTP_409_CONFLICT,
+            )
         try:
             target_membership = Membership.objects.get(
                 gameya=gameya,
@@ -161,28 +150,52 @@ class GameyaViewSet(viewsets.ModelViewSet):
                 {"detail": "No active member found for the current payout order."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        except Membership.MultipleObjectsReturned:
+            return Response(
+                {"detail": "Several active members share the current payout order."},
+                status=status.HTTP_409_CONFLICT,
+            )
         active_members=gameya.memberships.filter(is_active=True).count()
         pot=gameya.contribution_amount * Decimal(active_members)
+        paid_round = gameya.current_round
 
-        wallet, _ = Wallet.objects.get_or_create(user=target_membership.user)
+        wallet = get_wallet(target_membership.user)
         with transaction.atomic():
-            wallet.balance = wallet.balance + pot
-            wallet.save()
+            # Advance only if nobody else paid this round in the meantime
+            if paid_round >= gameya.duration_months:
+                advanced = Gameya.objects.filter(pk=gameya.pk, status='ACTIVE', current_round=paid_round).update(
+                    status='COMPLETED',
+                    next_payout_date=None,
+                )
+            else:
+                advanced = Gameya.objects.filter(pk=gameya.pk, status='ACTIVE', current_round=paid_round).update(
+                    current_round=F('current_round') + 1,
+                    next_payout_date=gameya.payout_date_for_round(paid_round + 1),
+                )
+            if not advanced:
+                return Response(
+                    {"detail": "This round has already been paid out."},
+                    status=status.HTTP_409_CONFLICT,
+                )
 
-            Transaction.objects.create(
-                wallet=wallet,
-                transaction_type='PAYOUT',
+            credit(
+                wallet,
+                pot,
+                'PAYOUT',
+                reference_id=f"GAMEYA-{gameya.id}-ROUND-{paid_round}",
+                description=f"Payout for Gameya {gameya.name}, round {paid_round}",
+                gameya=gameya,
+                gameya_round=paid_round,
+            )
+            PayoutSchedule.objects.filter(gameya=gameya, round=paid_round).update(
+                status='PAID',
+                membership=target_membership,
                 amount=pot,
-                reference_id=f"GAMEYA-{gameya.id}-ROUND-{gameya.current_round}",
-                description=f"Payout for Gameya {gameya.name}, round {gameya.current_round}",
+                paid_at=timezone.now(),
             )
 
-            # move to next round or complete
-            if gameya.current_round >= gameya.duration_months:
-                gameya.status = 'COMPLETED'
-            else:
-                gameya.current_round += 1
-            gameya.save()
+        gameya.refresh_from_db(fields=['current_round', 'status'])
+        invalidate_open_listing()
 
         return Response(
             {
@@ -194,24 +207,29 @@ class GameyaViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK,
         )
     
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
+    def collect(self, request, pk=None):
+        """Auto-debit the current round from every active member who has not paid yet."""
+        gameya = self.get_object()
+        if gameya.creator != request.user and not request.user.is_superuser:
+            return Response(
+                {"detail": "Only the Gameya creator or admin can collect contributions."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        if gameya.status != 'ACTIVE':
+            return Response({"detail": "Only active Gameyas can collect contributions."}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = collect_round([gameya.pk])
+        return Response({"round": gameya.current_round, **report}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_gameyas(self, request):
-        memberships = Membership.objects.filter(user=request.user, is_active=True)
-
-        # Get all related Gameyas
-        gameyas = [m.gameya for m in memberships]
+        page = self.paginate_queryset(self.active_memberships(request.user))
 
         data = []
-        for m in memberships:
+        for m in page:
             gameya = m.gameya
-
-            # Check if user contributed this month
-            contributed_this_month = Contribution.objects.filter(
-                membership=m,
-                month=gameya.current_round,
-                confirmed=True
-            ).exists()
-
             data.append({
                 "gameya_id": gameya.id,
                 "gameya_name": gameya.name,
@@ -221,10 +239,24 @@ class GameyaViewSet(viewsets.ModelViewSet):
                 "total_members": gameya.total_members,
                 "max_members": gameya.max_members,
                 "status": gameya.status,
-                "contributed_this_month": contributed_this_month,
+                "contributed_this_month": m.contributed_this_month,
             })
 
-        return Response(data)
+        return self.get_paginated_response(data)
+
+    def active_memberships(self, user):
+        """The user's active memberships with their gameya and a "contributed this round" flag, in one query."""
+        contributed = Contribution.objects.filter(
+            membership=OuterRef('pk'),
+            month=OuterRef('gameya__current_round'),
+            confirmed=True,
+        )
+        return (
+            Membership.objects.filter(user=user, is_active=True)
+            .select_related('gameya')
+            .annotate(contributed_this_month=Exists(contributed))
+            .order_by('-joined_at', '-pk')
+        )
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def contribution_history(self, request, pk=None):
@@ -257,20 +289,45 @@ class GameyaViewSet(viewsets.ModelViewSet):
             "contribution_history": data
         })
 
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def contribution_matrix(self, request, pk=None):
+        """Who has paid for each round, for the creator: members x rounds plus per-round totals."""
+        gameya = self.get_object()
+        if gameya.creator != request.user and not request.user.is_superuser:
+            return Response(
+                {"detail": "Only the Gameya creator or admin can view the contribution matrix."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(contribution_matrix(gameya))
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def flows(self, request, pk=None):
+        """Contributions and payouts of this Gameya, optionally for one ?round=."""
+        gameya = self.get_object()
+        if gameya.creator != request.user and not request.user.is_superuser:
+            return Response(
+                {"detail": "Only the Gameya creator or admin can view its transactions."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        flows = gameya.transactions.all()
+        round_no = request.query_params.get('round')
+        if round_no is not None:
+            if not round_no.isdigit():
+                return Response({"detail": "round must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+            flows = flows.filter(gameya_round=int(round_no))
+
+        page = self.paginate_queryset(flows.order_by('gameya_round', 'created_at', 'pk'))
+        return self.get_paginated_response(TransactionSerializer(page, many=True).data)
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def active(self, request):
-        memberships = Membership.objects.filter(user=request.user, is_active=True)
+        page = self.paginate_queryset(self.active_memberships(request.user))
 
         results = []
 
-        for m in memberships:
+        for m in page:
             g = m.gameya
 
-            # Calculate next payout date (if you plan payouts monthly)
-            next_payout_date = None
-            if g.start_date:
-                next_payout_date = g.start_date + timezone.timedelta(days=30 * (g.current_round - 1))
-
             results.append({
                 "gameya_id": g.id,
                 "gameya_name": g.name,
@@ -290,12 +347,37 @@ class GameyaViewSet(viewsets.ModelViewSet):
                 "max_members": g.max_members,
                 "total_members": g.total_members,
 
-                "next_payout_date": next_payout_date,
+                "next_payout_date": g.next_payout_date,
+                "contributed_this_month": m.contributed_this_month,
             })
 
-        return Response(results)
+        return self.get_paginated_response(results)
     
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def schedule(self, request, pk=None):
+        gameya = self.get_object()
+        rounds = gameya.payout_schedule.select_related('membership__user').order_by('round')
+        return Response({
+            "gameya_id": gameya.id,
+            "gameya_name": gameya.name,
+            "schedule": PayoutScheduleSerializer(rounds, many=True).data,
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def payout_calendar(self, request):
+        """Upcoming payouts across every Gameya the user is an active member of."""
+        rounds = PayoutSchedule.objects.filter(
+            status='PENDING',
+            gameya__status='ACTIVE',
+            gameya__memberships__user=request.user,
+            gameya__memberships__is_active=True,
+        ).select_related('gameya', 'membership__user').order_by('due_date', 'gameya_id', 'round')
+
+        page = self.paginate_queryset(rounds)
+        return self.get_paginated_response(PayoutScheduleSerializer(page, many=True).data)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def contribute(self, request, pk=None):
 
         gameya = self.get_object()
@@ -308,50 +390,51 @@ class GameyaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        wallet, _ = Wallet.objects.get_or_create(user=request.user)
+        wallet = get_wallet(request.user)
 
         amount = gameya.contribution_amount
         month = request.data.get('month', gameya.current_round)
 
-        # ✔ Prevent duplicate contributions
-        if Contribution.objects.filter(
-            membership=membership,
-            month=month,
-            confirmed=True
-        ).exists():
-            return Response(
-                {"detail": "You have already contributed for this month."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        try:
+            with transaction.atomic():
+                # Lock the gameya so this and collect_round see each other's contributions
+                gameya = Gameya.objects.select_for_update().get(pk=gameya.pk)
+
+                # ✔ Prevent duplicate contributions
+                if Contribution.objects.filter(membership=membership, month=month).exists():
+                    return Response(
+                        {"detail": "You have already contributed for this month."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                # Withdraw + log transaction (fails if the balance is too low)
+                debit(
+                    wallet,
+                    amount,
+                    'CONTRIBUTION',
+                    reference_id=f"GAMEYA-{gameya.id}-ROUND-{month}",
+                    description=f"Contribution for Gameya {gameya.name}, month {month}",
+                    gameya=gameya,
+                    gameya_round=month,
+                )
 
-        # ✔ Check balance
-        if wallet.balance < amount:
+                # Create contribution
+                contribution = Contribution.objects.create(
+                    membership=membership,
+                    amount=amount,
+                    month=month,
+                    confirmed=True,
+                )
+        except InsufficientFunds:
             return Response(
                 {"detail": "Insufficient wallet balance."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        with transaction.atomic():
-
-            # Withdraw
-            wallet.balance -= amount
-            wallet.save()
-
-            # Log transaction
-            Transaction.objects.create(
-                wallet=wallet,
-                transaction_type='CONTRIBUTION',
-                amount=amount,
-                reference_id=f"GAMEYA-{gameya.id}-ROUND-{month}",
-                description=f"Contribution for Gameya {gameya.name}, month {month}",
-            )
-
-            # Create contribution
-            contribution = Contribution.objects.create(
-                membership=membership,
-                amount=amount,
-                month=month,
-                confirmed=True,
+        except IntegrityError:
+            # a concurrent request recorded this month first; the debit was rolled back with it
+            return Response(
+                {"detail": "You have already contributed for this month."},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
         # increase trust score
@@ -159,6 +159,20 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Per-process cache for short-lived listings and reports; point this at a shared
+# backend (e.g. Redis) in production so invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Idempotency-Key replay store for POST money actions (wallet/idempotency.py)
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)            # how long a completed response is replayed
+IDEMPOTENCY_IN_FLIGHT_TIMEOUT = timedelta(seconds=60) # after this an unfinished request can be retried
+IDEMPOTENCY_WAIT_TIMEOUT = 10                        # seconds a duplicate waits for the in-flight one
+IDEMPOTENCY_MAX_KEYS_PER_USER = 1000                 # oldest completed keys are evicted beyond this
+
 
 CORS_ALLOW_ALL_ORIGINS = True  # ✅ allows all origins (development mode)
 # or if you want to be stricter:
@@ -1,15 +1,36 @@
-from django.contrib import admin
-from .models import Loan, Repayment
+from django.contrib import admin, messages
+from .models import Loan, Repayment, Installment
+from .services import review_loans
 
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'amount', 'status', 'interest_rate', 'created_at', 'approved_at')
-    list_filter = ('status',)
+    list_display = ('id', 'user', 'amount', 'status', 'interest_rate', 'total_repaid', 'created_at', 'approved_at')
+    list_filter = ('status', 'is_overdue')
     search_fields = ('user__username',)
-    readonly_fields = ('approved_at',)
+    readonly_fields = ('approved_at', 'total_repaid', 'repayment_count', 'last_payment_date', 'is_overdue', 'overdue_since')
+    actions = ('approve_selected', 'reject_selected')
+
+    def review(self, request, queryset, decision):
+        outcomes = review_loans(list(queryset.values_list('pk', flat=True)), decision)
+        done = sum(1 for o in outcomes if o['outcome'] == decision + 'd')
+        self.message_user(request, f"{done} loans {decision}d, {len(outcomes) - done} skipped (not pending).", messages.SUCCESS)
+
+    @admin.action(description='Approve and disburse selected pending loans')
+    def approve_selected(self, request, queryset):
+        self.review(request, queryset, 'approve')
+
+    @admin.action(description='Reject selected pending loans')
+    def reject_selected(self, request, queryset):
+        self.review(request, queryset, 'reject')
 
 @admin.register(Repayment)
 class RepaymentAdmin(admin.ModelAdmin):
     list_display = ('loan', 'amount', 'payment_date', 'is_paid')
     list_filter = ('is_paid',)
     search_fields = ('loan__user__username',)
+
+@admin.register(Installment)
+class InstallmentAdmin(admin.ModelAdmin):
+    list_display = ('loan', 'number', 'due_date', 'amount', 'amount_paid', 'status')
+    list_filter = ('status',)
+    search_fields = ('loan__user__username',)
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from loans.services import rebuild_loan_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute total_repaid, repayment_count and last_payment_date of every loan from its repayments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Loans per UPDATE.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_loan_totals(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt totals of {count} loans in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from loans.overdue import OVERDUE_SCAN_CHUNK_SIZE, OVERDUE_TRUST_PENALTY, flag_overdue_loans
+
+
+class Command(BaseCommand):
+    help = (
+        "Flag APPROVED loans past their due date and lower their borrowers' trust scores. "
+        "Meant to run nightly; loans that are already flagged are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='YYYY-MM-DD; loans due before this date are overdue (default: today).')
+        parser.add_argument('--chunk-size', type=int, default=OVERDUE_SCAN_CHUNK_SIZE, help='Loans per transaction.')
+        parser.add_argument('--penalty', type=int, default=OVERDUE_TRUST_PENALTY, help='Trust score change per overdue loan.')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError('--date must be a YYYY-MM-DD date.')
+
+        if options['penalty'] > 0:
+            raise CommandError('--penalty must be zero or negative.')
+
+        started = time.perf_counter()
+        report = flag_overdue_loans(today=today, chunk_size=options['chunk_size'], penalty=options['penalty'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Flagged {report['flagged']} overdue loans of {report['users']} users "
+            f"in {report['chunks']} chunks, {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Loan = apps.get_model('loans', 'Loan')
+    Repayment = apps.get_model('loans', 'Repayment')
+    paid = Repayment.objects.filter(loan=OuterRef('pk'), is_paid=True).order_by().values('loan')
+    Loan.objects.update(
+        total_repaid=Coalesce(
+            Subquery(paid.annotate(s=Sum('amount')).values('s')),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        repayment_count=Coalesce(Subquery(paid.annotate(n=Count('pk')).values('n')), 0),
+        last_payment_date=Subquery(paid.annotate(d=Max('payment_date')).values('d')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_loan_repayment_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='last_payment_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='repayment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='total_repaid',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:23
+
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CENT = Decimal('0.01')
+
+
+def backfill_installments(apps, schema_editor):
+    """Give every approved or paid loan its schedule, with the repayments so far applied in order."""
+    Loan = apps.get_model('loans', 'Loan')
+    Installment = apps.get_model('loans', 'Installment')
+
+    loans = Loan.objects.filter(status__in=('APPROVED', 'PAID'), approved_at__isnull=False).order_by('pk')
+    batch = []
+    for loan in loans.iterator(chunk_size=500):
+        total = (loan.amount + loan.amount * loan.interest_rate / Decimal('100')).quantize(CENT)
+        count = loan.repayment_period
+        share = (total / count).quantize(CENT, rounding=ROUND_DOWN)
+        paid = loan.total_repaid
+        for n in range(1, count + 1):
+            amount = share if n < count else total - share * (count - 1)
+            applied = min(paid, amount)
+            paid -= applied
+            batch.append(Installment(
+                loan_id=loan.pk,
+                number=n,
+                due_date=loan.approved_at.date() + timedelta(days=30 * n),
+                amount=amount,
+                amount_paid=applied,
+                status='PAID' if applied >= amount else 'PARTIAL' if applied else 'PENDING',
+                paid_at=loan.last_payment_date if applied >= amount else None,
+            ))
+        if len(batch) >= 2000:
+            Installment.objects.bulk_create(batch)
+            batch = []
+    Installment.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_loan_repayment_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Installment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PARTIAL', 'Partially paid'), ('PAID', 'Paid')], default='PENDING', max_length=20)),
+                ('paid_at', models.DateField(blank=True, null=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='loans.loan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'due_date'], name='installment_due_idx'), models.Index(fields=['loan', 'status', 'number'], name='installment_next_idx')],
+                'unique_together': {('loan', 'number')},
+            },
+        ),
+        migrations.RunPython(backfill_installments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_installment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='overdue_since',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'due_date'], name='loan_due_scan_idx'),
+        ),
+    ]
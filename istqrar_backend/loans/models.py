@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
 
@@ -52,9 +54,32 @@ class Loan(models.Model):
         blank=True
     )
 
+    # Running totals of paid repayments, maintained by loans.services.record_repayment
+    total_repaid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    repayment_count = models.PositiveIntegerField(default=0)
+    last_payment_date = models.DateField(blank=True, null=True)
+
+    # Set by the scan_overdue_loans command once an approved loan passes its due_date
+    is_overdue = models.BooleanField(default=False)
+    overdue_since = models.DateField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='loan_due_scan_idx'),
+        ]
+
     def __str__(self):
         return f"Loan #{self.id} - {self.user} ({self.status})"
 
+    @property
+    def total_due(self):
+        interest = self.amount * Decimal(str(self.interest_rate)) / Decimal('100')
+        return (self.amount + interest).quantize(Decimal('0.01'))
+
+    @property
+    def remaining_amount(self):
+        return self.total_due - self.total_repaid
+
 
 class Repayment(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='repayments')
@@ -64,3 +89,34 @@ class Repayment(models.Model):
 
     def __str__(self):
         return f"Repayment for Loan {self.loan.id} - {self.amount} ({'Paid' if self.is_paid else 'Pending'})"
+
+
+class Installment(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PARTIAL', 'Partially paid'),
+        ('PAID', 'Paid'),
+    ]
+    OPEN_STATUSES = ('PENDING', 'PARTIAL')
+
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='installments')
+    number = models.PositiveIntegerField()
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    paid_at = models.DateField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('loan', 'number')
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='installment_due_idx'),
+            models.Index(fields=['loan', 'status', 'number'], name='installment_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"Loan #{self.loan_id} installment {self.number} - {self.amount} due {self.due_date} ({self.status})"
+
+    @property
+    def remaining(self):
+        return self.amount - self.amount_paid
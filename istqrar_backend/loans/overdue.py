@@ -0,0 +1,52 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F
+from django.utils import timezone
+
+from users.utils import bulk_adjust_trust_scores
+from .models import Loan
+
+OVERDUE_SCAN_CHUNK_SIZE = 1000
+OVERDUE_TRUST_PENALTY = -15
+
+
+def overdue_candidates(today):
+    """APPROVED loans past their due date that are not flagged yet; served by the (status, due_date) index."""
+    return Loan.objects.filter(status='APPROVED', due_date__lt=today, is_overdue=False)
+
+
+def flag_overdue_loans(today=None, chunk_size=OVERDUE_SCAN_CHUNK_SIZE, penalty=OVERDUE_TRUST_PENALTY):
+    """
+    Flag every newly overdue loan and penalize its borrower's trust score, one
+    chunk per transaction: one UPDATE for the loans and one for the scores.
+    Already flagged loans are never picked again, so the scan can be re-run
+    (or run concurrently) without penalizing anyone twice.
+    """
+    today = today or timezone.localdate()
+    report = {"flagged": 0, "users": 0, "chunks": 0}
+    users = set()
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                overdue_candidates(today)
+                .select_for_update(skip_locked=True)
+                .order_by('due_date', 'pk')
+                .values_list('pk', 'user_id')[:chunk_size]
+            )
+            if not chunk:
+                report["users"] = len(users)
+                return report
+
+            # overdue from the day after the due date, however late the scan runs
+            Loan.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                is_overdue=True,
+                overdue_since=ExpressionWrapper(F('due_date') + timedelta(days=1), output_field=DateField()),
+            )
+            per_user = Counter(user_id for _, user_id in chunk)
+            bulk_adjust_trust_scores({user_id: penalty * count for user_id, count in per_user.items()})
+
+        report["flagged"] += len(chunk)
+        users.update(per_user)
+        report["chunks"] += 1
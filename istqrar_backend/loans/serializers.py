@@ -1,6 +1,5 @@
 from rest_framework import serializers
-from .models import Loan, Repayment
-from decimal import Decimal
+from .models import Loan, Repayment, Installment
 
 class RepaymentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,9 +8,16 @@ class RepaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'payment_date', 'is_paid']
 
 
+class InstallmentSerializer(serializers.ModelSerializer):
+    remaining = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Installment
+        fields = ['id', 'loan', 'number', 'due_date', 'amount', 'amount_paid', 'remaining', 'status', 'paid_at']
+
+
 class LoanSerializer(serializers.ModelSerializer):
     repayments = RepaymentSerializer(many=True, read_only=True)
-    total_repaid = serializers.SerializerMethodField()
     total_due = serializers.SerializerMethodField()
     remaining_amount = serializers.SerializerMethodField()
 
@@ -19,16 +25,38 @@ class LoanSerializer(serializers.ModelSerializer):
         model = Loan
         fields = '__all__'
         read_only_fields = [
-            'id', 'user', 'status', 'created_at', 'approved_at'
+            'id', 'user', 'status', 'created_at', 'approved_at',
+            'total_repaid', 'repayment_count', 'last_payment_date',
+            'is_overdue', 'overdue_since',
         ]
 
-    def get_total_repaid(self, obj):
-        return sum((r.amount for r in obj.repayments.filter(is_paid=True)), Decimal('0'))
-
     def get_total_due(self, obj):
-        amount = obj.amount
-        interest = amount * (obj.interest_rate / Decimal('100'))
-        return amount + interest
+        return obj.total_due
 
     def get_remaining_amount(self, obj):
-        return self.get_total_due(obj) - self.get_total_repaid(obj)
+        return obj.remaining_amount
+
+
+class LoanListSerializer(serializers.ModelSerializer):
+    """
+    Compact row for the staff loan list. Totals come from the stored columns;
+    the paid repayments are only included when the view asks for them and
+    prefetches them into `paid_repayments`.
+    """
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    total_due = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    remaining_amount = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    repayments = RepaymentSerializer(source='paid_repayments', many=True, read_only=True)
+
+    class Meta:
+        model = Loan
+        fields = [
+            'id', 'user', 'user_username', 'amount', 'interest_rate', 'repayment_period', 'status',
+            'created_at', 'approved_at', 'due_date', 'total_due', 'total_repaid', 'remaining_amount',
+            'repayment_count', 'last_payment_date', 'is_overdue', 'repayments',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('include_repayments'):
+            self.fields.pop('repayments')
@@ -0,0 +1,290 @@
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.utils import get_trust_score
+from wallet.services import ensure_wallets, bulk_credit, bulk_debit
+from .models import Loan, Repayment, Installment
+
+CENT = Decimal('0.01')
+MIN_LOAN_TRUST_SCORE = 60
+MAX_INTEREST_RATE = Decimal('100')
+
+
+class NothingToRepay(Exception):
+    pass
+
+
+class Overpayment(Exception):
+    pass
+
+
+class InvalidInterestRate(Exception):
+    pass
+
+
+def parse_interest_rate(value):
+    """
+    Interest rate override from request data as a Decimal, or None when not
+    given. Raises InvalidInterestRate unless it is a finite number from 0 to
+    MAX_INTEREST_RATE with at most two decimal places (Loan.interest_rate).
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise InvalidInterestRate()
+    try:
+        rate = Decimal(str(value).strip())
+    except ArithmeticError:
+        raise InvalidInterestRate()
+    if not rate.is_finite() or not 0 <= rate <= MAX_INTEREST_RATE or rate != rate.quantize(CENT):
+        raise InvalidInterestRate()
+    return rate
+
+
+def loan_eligibility(user):
+    """Whether `user` may apply for a loan, from the cached trust score only (no request body needed)."""
+    score = get_trust_score(user.pk)
+    eligible = score is not None and score >= MIN_LOAN_TRUST_SCORE
+    return {
+        "eligible": eligible,
+        "trust_score": score,
+        "min_trust_score": MIN_LOAN_TRUST_SCORE,
+        "detail": None if eligible else "Your trust score is too low to apply for a loan.",
+    }
+
+
+def record_repayment(loan, amount):
+    """
+    Create a paid Repayment and add it to the loan's stored totals in the same
+    transaction. The totals move with a single F() UPDATE, so concurrent
+    repayments never overwrite each other; `loan` is refreshed afterwards and
+    closed as PAID once fully repaid.
+    """
+    with transaction.atomic():
+        repayment = Repayment.objects.create(loan=loan, amount=amount, is_paid=True)
+        Loan.objects.filter(pk=loan.pk).update(
+            total_repaid=F('total_repaid') + amount,
+            repayment_count=F('repayment_count') + 1,
+            last_payment_date=repayment.payment_date,
+        )
+        allocate_repayment(loan, amount, repayment.payment_date)
+        loan.refresh_from_db(fields=['total_repaid', 'repayment_count', 'last_payment_date'])
+        if loan.status == 'APPROVED' and loan.total_repaid >= loan.total_due:
+            mark_loans_paid([loan.pk])
+            loan.refresh_from_db(fields=['status', 'is_overdue', 'overdue_since'])
+    return repayment
+
+
+def mark_loans_paid(loan_ids):
+    """Close the loans as PAID and clear their overdue flags (one UPDATE)."""
+    return Loan.objects.filter(pk__in=loan_ids).update(status='PAID', is_overdue=False, overdue_since=None)
+
+
+def installment_plan(total, count, start):
+    """(number, due_date, amount) of `count` monthly installments of `total`; the last one absorbs the rounding."""
+    total = total.quantize(CENT)
+    share = (total / count).quantize(CENT, rounding=ROUND_DOWN)
+    return [
+        (n, start + timedelta(days=30 * n), share if n < count else total - share * (count - 1))
+        for n in range(1, count + 1)
+    ]
+
+
+def build_installments(loans, start=None):
+    """Create the whole schedule of every given loan with one bulk insert, one installment per month of repayment_period."""
+    start = start or timezone.localdate()
+    return Installment.objects.bulk_create([
+        Installment(loan=loan, number=number, due_date=due_date, amount=amount)
+        for loan in loans
+        for number, due_date, amount in installment_plan(loan.total_due, loan.repayment_period, start)
+    ])
+
+
+def review_loans(loan_ids, decision, interest_rate=None):
+    """
+    Approve or reject many PENDING loans in one transaction. The loans are
+    locked, approved ones are disbursed with a single bulk credit and get their
+    installments in one bulk insert. Returns one outcome per requested id.
+    """
+    today = timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        loans = {loan.pk: loan for loan in Loan.objects.select_for_update().filter(pk__in=loan_ids)}
+        pending = [loans[pk] for pk in dict.fromkeys(loan_ids) if pk in loans and loans[pk].status == 'PENDING']
+
+        if decision == 'approve':
+            for loan in pending:
+                if interest_rate is not None:
+                    loan.interest_rate = interest_rate
+                loan.status = 'APPROVED'
+                loan.approved_at = now
+                loan.due_date = today + timedelta(days=30 * loan.repayment_period)
+            Loan.objects.bulk_update(pending, ['status', 'approved_at', 'due_date', 'interest_rate'])
+
+            wallets = ensure_wallets(loan.user_id for loan in pending)
+            bulk_credit(
+                [(wallets[loan.user_id], loan.amount, f"LOAN-{loan.pk}", "Loan disbursement", {"loan": loan})
+                 for loan in pending],
+                'LOAN_DISBURSE',
+            )
+            build_installments(pending, start=today)
+        else:
+            Loan.objects.filter(pk__in=[loan.pk for loan in pending]).update(status='REJECTED')
+
+    done = 'APPROVED' if decision == 'approve' else 'REJECTED'
+    reviewed = {loan.pk for loan in pending}
+    outcomes = []
+    for pk in dict.fromkeys(loan_ids):
+        if pk not in loans:
+            outcomes.append({"loan_id": pk, "status": None, "outcome": 'not_found'})
+        elif pk in reviewed:
+            outcomes.append({"loan_id": pk, "status": done, "outcome": decision + 'd'})
+        else:
+            outcomes.append({"loan_id": pk, "status": loans[pk].status, "outcome": 'already_processed'})
+    return outcomes
+
+
+def allocate_repayment(loan, amount, paid_on):
+    """Apply a repayment to the loan's open installments, oldest first. Returns what was left over."""
+    changed = []
+    for installment in (
+        Installment.objects.select_for_update()
+        .filter(loan=loan, status__in=Installment.OPEN_STATUSES)
+        .order_by('number')
+    ):
+        if amount <= 0:
+            break
+        applied = min(amount, installment.remaining)
+        amount -= applied
+        installment.amount_paid += applied
+        if installment.remaining <= 0:
+            installment.status = 'PAID'
+            installment.paid_at = paid_on
+        else:
+            installment.status = 'PARTIAL'
+        changed.append(installment)
+    Installment.objects.bulk_update(changed, ['amount_paid', 'status', 'paid_at'])
+    return amount
+
+
+def next_installment(loan):
+    return (
+        Installment.objects.filter(loan=loan, status__in=Installment.OPEN_STATUSES)
+        .order_by('number')
+        .first()
+    )
+
+
+def overdue_installments(today=None):
+    return Installment.objects.filter(
+        status__in=Installment.OPEN_STATUSES,
+        due_date__lt=today or timezone.localdate(),
+    )
+
+
+def next_due_date():
+    """Due date of the loan's oldest open installment, or its due_date when it has no schedule."""
+    oldest_open = (
+        Installment.objects.filter(loan=OuterRef('pk'), status__in=Installment.OPEN_STATUSES)
+        .order_by().values('loan').annotate(d=Min('due_date')).values('d')
+    )
+    return Coalesce(Subquery(oldest_open), 'due_date')
+
+
+# policy -> sort key over the borrower's approved loans (annotated with next_due)
+REPAYMENT_POLICIES = {
+    'oldest_due': lambda loan: (loan.next_due is None, loan.next_due, loan.pk),
+    'highest_interest': lambda loan: (-loan.interest_rate, loan.next_due is None, loan.next_due, loan.pk),
+    'smallest_balance': lambda loan: (loan.remaining_amount, loan.pk),
+}
+
+
+def repay_loans(user, amount, policy='oldest_due'):
+    """
+    Spread one payment of `amount` over all of the user's APPROVED loans in
+    the order given by `policy`, in one transaction: one wallet UPDATE, bulk
+    inserts for the Repayments and their transactions, one UPDATE for the loan
+    totals and one for the loans it pays off. Raises NothingToRepay,
+    Overpayment, or InsufficientFunds (and nothing is written).
+    """
+    with transaction.atomic():
+        loans = list(
+            Loan.objects.select_for_update()
+            .filter(user=user, status='APPROVED')
+            .annotate(next_due=next_due_date())
+        )
+        loans = [loan for loan in loans if loan.remaining_amount > 0]
+        if not loans:
+            raise NothingToRepay()
+        if amount > sum(loan.remaining_amount for loan in loans):
+            raise Overpayment()
+
+        loans.sort(key=REPAYMENT_POLICIES[policy])
+        allocations, left = [], amount
+        for loan in loans:
+            if left <= 0:
+                break
+            share = min(left, loan.remaining_amount)
+            left -= share
+            allocations.append((loan, share))
+
+        repayments = Repayment.objects.bulk_create([
+            Repayment(loan=loan, amount=share, is_paid=True) for loan, share in allocations
+        ])
+        paid_on = repayments[0].payment_date
+        money = DecimalField(max_digits=12, decimal_places=2)
+        Loan.objects.filter(pk__in=[loan.pk for loan, _ in allocations]).update(
+            total_repaid=F('total_repaid') + Case(
+                *[When(pk=loan.pk, then=Value(share)) for loan, share in allocations], output_field=money,
+            ),
+            repayment_count=F('repayment_count') + 1,
+            last_payment_date=paid_on,
+        )
+        for loan, share in allocations:
+            allocate_repayment(loan, share, paid_on)
+
+        wallet_id = ensure_wallets([user.pk])[user.pk]
+        bulk_debit(
+            [(wallet_id, share, f"LOAN-{loan.pk}", f"Loan repayment for Loan #{loan.pk}",
+              {"loan": loan, "repayment": repayment})
+             for (loan, share), repayment in zip(allocations, repayments)],
+            'LOAN_REPAY',
+        )
+
+        paid_off = [loan.pk for loan, share in allocations if share >= loan.remaining_amount]
+        mark_loans_paid(paid_off)
+
+    return [
+        {
+            "loan_id": loan.pk,
+            "amount": share,
+            "remaining": loan.remaining_amount - share,
+            "status": 'PAID' if loan.pk in paid_off else loan.status,
+        }
+        for loan, share in allocations
+    ]
+
+
+def loan_totals():
+    """Update expressions that recompute every stored total from the Repayment table."""
+    paid = Repayment.objects.filter(loan=OuterRef('pk'), is_paid=True).order_by().values('loan')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        "total_repaid": Coalesce(Subquery(paid.annotate(s=Sum('amount')).values('s')), Value(Decimal('0')), output_field=money),
+        "repayment_count": Coalesce(Subquery(paid.annotate(n=Count('pk')).values('n')), 0),
+        "last_payment_date": Subquery(paid.annotate(d=Max('payment_date')).values('d')),
+    }
+
+
+def rebuild_loan_totals(batch_size=1000):
+    """Recompute the stored totals of every loan, one UPDATE per `batch_size` loans. Returns the number of loans."""
+    ids = list(Loan.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        Loan.objects.filter(pk__gte=batch[0], pk__lte=batch[-1]).update(**loan_totals())
+    return len(ids)
@@ -1,3 +1,404 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.parsers import MultiPartParser
+from rest_framework.test import APIClient
+
+from users.models import TrustScore
+from wallet.models import Transaction, Wallet
+
+from .analytics import load_loans, portfolio_report
+from .models import Loan, Repayment, Installment
+from .overdue import flag_overdue_loans
+from .services import MIN_LOAN_TRUST_SCORE, build_installments, record_repayment
+
+User = get_user_model()
+
+
+class LoanListQueryCountTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.borrower = User.objects.create(username='borrower')
+        self.client = APIClient()
+
+    def add_loans(self, count):
+        for n in range(count):
+            loan = Loan.objects.create(
+                user=self.borrower,
+                amount=1000,
+                purpose=f'Loan {n}',
+                status='APPROVED',
+                total_repaid=200,
+                repayment_count=2,
+            )
+            Repayment.objects.create(loan=loan, amount=100, is_paid=True)
+            Repayment.objects.create(loan=loan, amount=100, is_paid=True)
+
+    def count_queries(self, user, url):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_staff_list_is_compact_and_constant(self):
+        self.add_loans(1)
+        few, _ = self.count_queries(self.staff, '/api/loans/')
+        self.add_loans(9)
+        many, data = self.count_queries(self.staff, '/api/loans/')
+
+        self.assertEqual(few, many)
+        self.assertEqual(data['count'], 10)
+        row = data['results'][0]
+        self.assertNotIn('repayments', row)
+        self.assertEqual(row['user_username'], 'borrower')
+        self.assertEqual(row['total_repaid'], '200.00')
+        self.assertEqual(row['remaining_amount'], '800.00')
+
+    def test_staff_list_with_repayments_is_constant(self):
+        self.add_loans(1)
+        few, _ = self.count_queries(self.staff, '/api/loans/?include=repayments')
+        self.add_loans(9)
+        many, data = self.count_queries(self.staff, '/api/loans/?include=repayments')
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['results'][0]['repayments']), 2)
+
+    def test_borrower_list_is_constant(self):
+        self.add_loans(1)
+        few, _ = self.count_queries(self.borrower, '/api/loans/')
+        self.add_loans(9)
+        many, data = self.count_queries(self.borrower, '/api/loans/')
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(data['results'][0]['repayments']), 2)
+
+
+class InstallmentScheduleTests(TestCase):
+    def setUp(self):
+        self.borrower = User.objects.create(username='borrower')
+
+    def test_installments_add_up_to_total_due(self):
+        cases = [
+            ('1000.00', '0', 3),
+            ('1000.00', '7.5', 3),
+            ('999.99', '12.35', 6),
+            ('100.01', '3.33', 12),
+            ('0.05', '0', 12),
+        ]
+        loans = [
+            Loan.objects.create(
+                user=self.borrower,
+                amount=Decimal(amount),
+                interest_rate=Decimal(rate),
+                repayment_period=period,
+                purpose='schedule',
+                status='APPROVED',
+            )
+            for amount, rate, period in cases
+        ]
+        build_installments(loans)
+
+        for loan in loans:
+            amounts = list(loan.installments.order_by('number').values_list('amount', flat=True))
+            self.assertEqual(len(amounts), loan.repayment_period)
+            self.assertEqual(sum(amounts), loan.total_due)
+            self.assertTrue(all(a >= 0 for a in amounts))
+
+    def test_repaying_total_due_settles_every_installment(self):
+        loan = Loan.objects.create(
+            user=self.borrower,
+            amount=Decimal('999.99'),
+            interest_rate=Decimal('12.35'),
+            repayment_period=6,
+            purpose='schedule',
+            status='APPROVED',
+        )
+        build_installments([loan])
+        record_repayment(loan, Decimal('500.00'))
+        record_repayment(loan, loan.total_due - Decimal('500.00'))
+
+        self.assertEqual(loan.remaining_amount, Decimal('0'))
+        self.assertFalse(loan.installments.filter(status__in=Installment.OPEN_STATUSES).exists())
+
+
+class LoanReviewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def pending_loans(self, count):
+        loans = []
+        for n in range(count):
+            borrower = User.objects.create(username=f'borrower{Loan.objects.count()}')
+            loans.append(Loan.objects.create(user=borrower, amount=1000, purpose=f'Loan {n}', repayment_period=3))
+        return [loan.pk for loan in loans]
+
+    def batch_review(self, loan_ids, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/loans/batch_review/', {'loan_ids': loan_ids, 'decision': 'approve', **extra}, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    def test_batch_approval_query_count_is_constant(self):
+        few, _ = self.batch_review(self.pending_loans(2), interest_rate='7.5')
+        many, data = self.batch_review(self.pending_loans(20), interest_rate='7.5')
+
+        self.assertEqual(few, many)
+        self.assertEqual(data['processed'], 20)
+        self.assertEqual(Installment.objects.count(), 22 * 3)
+        self.assertFalse(Loan.objects.exclude(interest_rate=Decimal('7.5')).exists())
+        self.assertEqual(Transaction.objects.filter(transaction_type='LOAN_DISBURSE').count(), 22)
+
+    def test_interest_rate_is_validated(self):
+        loan_id = self.pending_loans(1)[0]
+        for rate in ['NaN', 'Infinity', '-1', '100.01', '1.234', 'abc', True, 1000]:
+            batch = self.client.post(
+                '/api/loans/batch_review/',
+                {'loan_ids': [loan_id], 'decision': 'approve', 'interest_rate': rate},
+                format='json',
+            )
+            single = self.client.post(f'/api/loans/{loan_id}/approve/', {'interest_rate': rate}, format='json')
+            self.assertEqual((batch.status_code, single.status_code), (400, 400), rate)
+
+        self.assertEqual(Loan.objects.get(pk=loan_id).status, 'PENDING')
+        response = self.client.post(f'/api/loans/{loan_id}/approve/', {'interest_rate': '100'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Loan.objects.get(pk=loan_id).total_due, Decimal('2000.00'))
+
+
+class OverdueScanTests(TestCase):
+    def setUp(self):
+        self.borrower = User.objects.create(username='borrower')
+        self.today = date(2026, 10, 18)
+
+    def approved_loan(self, due_date):
+        return Loan.objects.create(
+            user=self.borrower, amount=300, purpose='late', repayment_period=3,
+            status='APPROVED', due_date=due_date,
+        )
+
+    def test_flags_from_the_day_after_due_and_counts_users_once(self):
+        first = self.approved_loan(date(2026, 9, 1))
+        self.approved_loan(date(2026, 10, 1))
+        self.approved_loan(self.today)
+
+        report = flag_overdue_loans(today=self.today, chunk_size=1)
+
+        self.assertEqual(report, {"flagged": 2, "users": 1, "chunks": 2})
+        first.refresh_from_db()
+        self.assertTrue(first.is_overdue)
+        self.assertEqual(first.overdue_since, date(2026, 9, 2))
+        self.assertEqual(flag_overdue_loans(today=self.today)["flagged"], 0)
+
+    def test_positive_penalty_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('scan_overdue_loans', penalty=5, stdout=StringIO())
+
+    def test_paying_off_clears_the_overdue_flag(self):
+        loan = self.approved_loan(date(2026, 9, 1))
+        build_installments([loan], start=date(2026, 6, 1))
+        flag_overdue_loans(today=self.today)
+
+        record_repayment(loan, Decimal('100.00'))
+        self.assertTrue(Loan.objects.get(pk=loan.pk).is_overdue)
+        record_repayment(loan, Decimal('200.00'))
+
+        loan.refresh_from_db()
+        self.assertEqual((loan.status, loan.is_overdue, loan.overdue_since), ('PAID', False, None))
+
+
+class LoanApplicationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.borrower = User.objects.create(username='applicant')
+        self.client = APIClient()
+        self.client.force_authenticate(self.borrower)
+
+    def apply(self):
+        with patch.object(MultiPartParser, 'parse', autospec=True, side_effect=MultiPartParser.parse) as parse:
+            response = self.client.post(
+                '/api/loans/',
+                {'amount': '500', 'purpose': 'Stock', 'repayment_period': 3},
+                format='multipart',
+            )
+        return response, parse.call_count
+
+    def test_ineligible_application_is_not_parsed(self):
+        response, parsed = self.apply()  # new users start at 50, below MIN_LOAN_TRUST_SCORE
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(parsed, 0)
+        self.assertFalse(Loan.objects.exists())
+
+    def test_eligible_application_is_parsed(self):
+        TrustScore.objects.filter(user=self.borrower).update(score=MIN_LOAN_TRUST_SCORE)
+
+        response, parsed = self.apply()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(parsed, 1)
+
+
+class RepayAllTests(TestCase):
+    def setUp(self):
+        self.borrower = User.objects.create(username='borrower')
+        self.wallet = Wallet.objects.create(user=self.borrower, balance=Decimal('5000.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.borrower)
+        # (amount, rate, schedule start): the oldest is due first, the newest has the highest rate
+        self.oldest = self.loan('400.00', '0', date(2026, 1, 1))
+        self.middle = self.loan('300.00', '5', date(2026, 3, 1))
+        self.newest = self.loan('1000.00', '10', date(2026, 5, 1))
+
+    def loan(self, amount, rate, start):
+        loan = Loan.objects.create(
+            user=self.borrower, amount=Decimal(amount), interest_rate=Decimal(rate),
+            purpose='stock', repayment_period=3, status='APPROVED',
+            due_date=start + timedelta(days=90),
+        )
+        build_installments([loan], start=start)
+        return loan
+
+    def repay_all(self, amount, policy=None):
+        data = {'amount': amount, **({'policy': policy} if policy else {})}
+        return self.client.post('/api/loans/repay_all/', data, format='json')
+
+    def allocations(self, response):
+        return [(a['loan_id'], a['amount']) for a in response.data['allocations']]
+
+    def test_oldest_due_pays_off_in_order(self):
+        response = self.repay_all('500.00')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.allocations(response), [
+            (self.oldest.pk, Decimal('400.00')), (self.middle.pk, Decimal('100.00')),
+        ])
+        self.oldest.refresh_from_db()
+        self.middle.refresh_from_db()
+        self.assertEqual(self.oldest.status, 'PAID')
+        self.assertFalse(self.oldest.installments.filter(status__in=Installment.OPEN_STATUSES).exists())
+        self.assertEqual((self.middle.status, self.middle.total_repaid), ('APPROVED', Decimal('100.00')))
+        self.assertEqual(self.middle.installments.get(number=1).amount_paid, Decimal('100.00'))
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('4500.00'))
+        self.assertEqual(
+            Transaction.objects.filter(transaction_type='LOAN_REPAY', loan__isnull=False, repayment__isnull=False).count(),
+            2,
+        )
+
+    def test_other_policies(self):
+        response = self.repay_all('100.00', 'highest_interest')
+        self.assertEqual(self.allocations(response), [(self.newest.pk, Decimal('100.00'))])
+
+        response = self.repay_all('320.00', 'smallest_balance')
+        self.assertEqual(self.allocations(response), [
+            (self.middle.pk, Decimal('315.00')), (self.oldest.pk, Decimal('5.00')),
+        ])
+        self.middle.refresh_from_db()
+        self.assertEqual(self.middle.status, 'PAID')
+
+    def test_paying_everything_closes_every_loan(self):
+        total = sum(loan.total_due for loan in (self.oldest, self.middle, self.newest))
+        response = self.repay_all(str(total))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [a['status'] for a in response.data['allocations']], ['PAID', 'PAID', 'PAID'],
+        )
+        self.assertFalse(Loan.objects.filter(status='APPROVED').exists())
+        self.assertEqual(self.repay_all('1.00').status_code, 400)
+
+    def test_overpayment_and_shortfall_change_nothing(self):
+        total = sum(loan.total_due for loan in (self.oldest, self.middle, self.newest))
+        self.assertEqual(self.repay_all(str(total + Decimal('0.01'))).status_code, 400)
+
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal('50.00'))
+        self.assertEqual(self.repay_all('60.00').status_code, 400)
+
+        self.assertFalse(Repayment.objects.exists())
+        self.assertFalse(Loan.objects.exclude(total_repaid=0).exists())
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('50.00'))
+
+
+class LoanFlowsTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.borrower = User.objects.create(username='borrower')
+        self.loan = Loan.objects.create(user=self.borrower, amount=900, purpose='stock', repayment_period=3)
+        self.client = APIClient()
+
+    def test_flows_list_the_disbursement_and_repayments(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.post(f'/api/loans/{self.loan.pk}/approve/', {'interest_rate': '0'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(self.borrower)
+        response = self.client.post('/api/loans/repay_all/', {'amount': '250.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(f'/api/loans/{self.loan.pk}/flows/')
+        self.assertEqual(response.status_code, 200)
+        flows = [(t['transaction_type'], Decimal(t['amount']), t['loan']) for t in response.data['transactions']]
+        self.assertEqual(flows, [
+            ('LOAN_DISBURSE', Decimal('900'), self.loan.pk),
+            ('LOAN_REPAY', Decimal('250'), self.loan.pk),
+        ])
+        repayment = Repayment.objects.get(loan=self.loan)
+        self.assertEqual(response.data['transactions'][1]['repayment'], repayment.pk)
+
+
+class PortfolioReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        borrower = User.objects.create(username='borrower')
+        # half repaid, its oldest open installment 45 days late
+        late = Loan.objects.create(
+            user=borrower, amount=1000, interest_rate=10, total_repaid=550, purpose='stock',
+            repayment_period=2, status='APPROVED', due_date=date(2026, 5, 17),
+        )
+        Installment.objects.create(loan=late, number=1, due_date=date(2026, 3, 17), amount=550, amount_paid=550, status='PAID')
+        Installment.objects.create(loan=late, number=2, due_date=date(2026, 4, 17), amount=550)
+        # never scheduled, aged from its due date
+        Loan.objects.create(
+            user=borrower, amount=500, purpose='rent', repayment_period=1, status='APPROVED', due_date=date(2026, 7, 1),
+        )
+        Loan.objects.create(user=borrower, amount=200, total_repaid=200, purpose='fees', repayment_period=1, status='PAID')
+        Loan.objects.create(user=borrower, amount=800, purpose='pending', repayment_period=1)
+
+    def test_report(self):
+        report = portfolio_report(load_loans(), today=date(2026, 6, 1))
+
+        self.assertEqual(report['totals'], {
+            'loans': 3, 'open_loans': 2, 'disbursed': 1700.0, 'repaid': 750.0,
+            'outstanding_principal': 1000.0, 'outstanding_interest': 50.0,
+            'portfolio_at_risk_30': 0.5238,
+        })
+        self.assertEqual(report['aging']['loans'], [1, 0, 1, 0])
+        self.assertEqual(report['aging']['outstanding'], [500.0, 0.0, 550.0, 0.0])
+        self.assertEqual(report['repayment_rate']['loans'], [1, 0, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual(report['repayment_rate']['percentiles'], {'p25': 0.25, 'p50': 0.5, 'p75': 0.75})
+
+    def test_endpoint_is_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='borrower'))
+        self.assertEqual(client.get('/api/loans/portfolio/').status_code, 403)
 
-# Create your tests here.
+        client.force_authenticate(User.objects.create(username='staff', is_staff=True))
+        response = client.get('/api/loans/portfolio/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['loans'], 3)
@@ -7,10 +7,36 @@ from decimal import Decimal
 from django.utils import timezone
 
 from datetime import timedelta
+from django.db.models import F, Prefetch
 from .models import Loan, Repayment
-from .serializers import LoanSerializer, RepaymentSerializer
-from wallet.models import Wallet, Transaction
-from users.utils import update_trust_score
+from .serializers import LoanSerializer, LoanListSerializer, RepaymentSerializer, InstallmentSerializer
+from django.db import transaction
+from wallet.services import get_wallet, credit, debit, InsufficientFunds
+from wallet.serializers import TransactionSerializer
+from .services import (
+    build_installments,
+    loan_eligibility,
+    next_due_date,
+    next_installment,
+    overdue_installments,
+    parse_interest_rate,
+    record_repayment,
+    repay_loans,
+    review_loans,
+    InvalidInterestRate,
+    MAX_INTEREST_RATE,
+    NothingToRepay,
+    Overpayment,
+    REPAYMENT_POLICIES,
+)
+from wallet.idempotency import idempotent
+from django.core.cache import cache
+from .analytics import PORTFOLIO_CACHE_KEY, PORTFOLIO_CACHE_TTL, load_loans, portfolio_report
+from users.utils import update_trust_score, bulk_adjust_trust_scores
+
+
+BATCH_REVIEW_LIMIT = 1000
+INTEREST_RATE_ERROR = f'interest_rate must be a number from 0 to {MAX_INTEREST_RATE} with at most 2 decimal places.'
 
 
 class LoanViewset(viewsets.ModelViewSet):
@@ -21,16 +47,57 @@ class LoanViewset(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         if user.is_superuser or user.is_staff:
-            return Loan.objects.all().order_by('-created_at')
-        return Loan.objects.filter(user=user).order_by('-created_at')
+            queryset = Loan.objects.all().order_by('-created_at')
+        else:
+            queryset = Loan.objects.filter(user=user).order_by('-created_at')
+
+        if self.action == 'list':
+            if self.compact_list():
+                queryset = queryset.select_related('user')
+                if self.include_repayments():
+                    queryset = queryset.prefetch_related(Prefetch(
+                        'repayments',
+                        queryset=Repayment.objects.filter(is_paid=True).order_by('-payment_date', '-pk'),
+                        to_attr='paid_repayments',
+                    ))
+            else:
+                queryset = queryset.prefetch_related('repayments')
+        return queryset
+
+    def compact_list(self):
+        user = self.request.user
+        return user.is_staff or user.is_superuser
+
+    def include_repayments(self):
+        return 'repayments' in self.request.query_params.get('include', '').split(',')
+
+    def get_serializer_class(self):
+        # Staff list every loan, so they get compact rows (?include=repayments adds the paid repayments)
+        if self.action == 'list' and self.compact_list():
+            return LoanListSerializer
+        return LoanSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_repayments'] = self.action == 'list' and self.include_repayments()
+        return context
+
+    def create(self, request, *args, **kwargs):
+        # Decide before request.data is touched, so a rejected applicant's
+        # document uploads are never parsed or spooled to disk.
+        eligibility = loan_eligibility(request.user)
+        if not eligibility['eligible']:
+            raise ValidationError({"detail": eligibility['detail']})
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        trust_score = self.request.user.trust_score.score
-        if trust_score < 60:
-            raise ValidationError({"detail": "Your trust score is too low to apply for a loan."})
-
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def eligibility(self, request):
+        """Cheap pre-check to call before uploading a loan application."""
+        return Response(loan_eligibility(request.user))
+
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):
@@ -40,33 +107,87 @@ class LoanViewset(viewsets.ModelViewSet):
             return Response({'detail': 'Loan already processed.'}, status=400)
 
         # interest override
-        interest_rate = request.data.get("interest_rate")
-        if interest_rate:
-            loan.interest_rate = Decimal(str(interest_rate))
+        try:
+            interest_rate = parse_interest_rate(request.data.get("interest_rate"))
+        except InvalidInterestRate:
+            return Response({'detail': INTEREST_RATE_ERROR}, status=400)
+        if interest_rate is not None:
+            loan.interest_rate = interest_rate
 
         # auto-set due date based on repayment period (3,6,12 months)
         months = loan.repayment_period
-        loan.due_date = timezone.now().date() + timedelta(days=30 * months)
-
-        # disburse to wallet
-        wallet, _ = Wallet.objects.get_or_create(user=loan.user)
-        wallet.balance += loan.amount
-        wallet.save()
-
-        Transaction.objects.create(
-            wallet=wallet,
-            transaction_type='LOAN_DISBURSE',
-            amount=loan.amount,
-            reference_id=f"LOAN-{loan.id}",
-            description=f"Loan disbursement"
-        )
+        today = timezone.localdate()
+        loan.due_date = today + timedelta(days=30 * months)
 
         loan.status = "APPROVED"
         loan.approved_at = timezone.now()
-        loan.save()
+
+        wallet = get_wallet(loan.user)
+        with transaction.atomic():
+            # Flip the status only if it is still pending, so a loan is never disbursed twice
+            claimed = Loan.objects.filter(pk=loan.pk, status='PENDING').update(
+                status=loan.status,
+                approved_at=loan.approved_at,
+                due_date=loan.due_date,
+                interest_rate=loan.interest_rate,
+            )
+            if not claimed:
+                return Response({'detail': 'Loan already processed.'}, status=400)
+
+            # disburse to wallet
+            credit(
+                wallet,
+                loan.amount,
+                'LOAN_DISBURSE',
+                reference_id=f"LOAN-{loan.id}",
+                description=f"Loan disbursement",
+                loan=loan,
+            )
+
+            # one installment per month; the last one is due on loan.due_date
+            build_installments([loan], start=today)
 
         return Response(LoanSerializer(loan).data, status=200)
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def portfolio(self, request):
+        """Exposure, aging buckets and repayment rates of the whole loan book, cached for a few minutes."""
+        key = PORTFOLIO_CACHE_KEY.format(today=timezone.localdate())
+        report = cache.get(key)
+        if report is None:
+            report = portfolio_report(load_loans())
+            report["generated_at"] = timezone.now()
+            cache.set(key, report, PORTFOLIO_CACHE_TTL)
+        return Response(report)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def batch_review(self, request):
+        """
+        Approve or reject many pending loans at once:
+        {"loan_ids": [...], "decision": "approve" | "reject", "interest_rate": optional}
+        """
+        loan_ids = request.data.get('loan_ids')
+        decision = request.data.get('decision')
+        if decision not in ('approve', 'reject'):
+            return Response({'detail': 'decision must be "approve" or "reject".'}, status=status.HTTP_400_BAD_REQUEST)
+        if (
+            not isinstance(loan_ids, list) or not loan_ids or len(loan_ids) > BATCH_REVIEW_LIMIT
+            or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in loan_ids)
+        ):
+            return Response(
+                {'detail': f'loan_ids must be a list of 1 to {BATCH_REVIEW_LIMIT} loan ids.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            interest_rate = parse_interest_rate(request.data.get('interest_rate'))
+        except InvalidInterestRate:
+            return Response({'detail': INTEREST_RATE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = review_loans(loan_ids, decision, interest_rate=interest_rate)
+        done = sum(1 for o in outcomes if o['outcome'] == decision + 'd')
+        return Response({"processed": done, "skipped": len(outcomes) - done, "results": outcomes}, status=200)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def reject(self, request, pk=None):
         loan = self.get_object()
@@ -79,6 +200,7 @@ class LoanViewset(viewsets.ModelViewSet):
         return Response({"detail": "Loan rejected."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
     def repay(self, request, pk=None):
         loan = self.get_object()
 
@@ -102,50 +224,34 @@ class LoanViewset(viewsets.ModelViewSet):
         if amount <= 0:
             return Response({'detail': 'Repayment amount must be positive.'}, status=400)
 
-        # Wallet check
-        wallet, _ = Wallet.objects.get_or_create(user=loan.user)
-        if wallet.balance < amount:
-            return Response({'detail': 'Insufficient wallet balance.'}, status=400)
-
-        # Calculate totals before repaying
-        serializer = LoanSerializer(loan)
-        total_due = Decimal(str(serializer.data['total_due']))
-        total_repaid = Decimal(str(serializer.data['total_repaid']))
-        remaining = total_due - total_repaid
-
-        # ❗ NEW: Prevent overpayment
-        if amount > remaining:
-            return Response({"detail": "You cannot repay more than the remaining loan amount."}, status=400)
-
-        # Deduct from wallet
-        wallet.balance = wallet.balance - amount
-        wallet.save()
-
-        # Log transaction
-        Transaction.objects.create(
-            wallet=wallet,
-            transaction_type='LOAN_REPAY',
-            amount=amount,
-            reference_id=f"LOAN-{loan.id}",
-            description=f"Loan repayment for Loan #{loan.id}"
-        )
+        wallet = get_wallet(loan.user)
 
-        # Create repayment record
-        Repayment.objects.create(
-            loan=loan,
-            amount=amount,
-            is_paid=True,
-            payment_date=timezone.now()
-        )
-
-        # Recalculate repayment totals AFTER payment
-        serializer = LoanSerializer(loan)
-        total_repaid = Decimal(str(serializer.data['total_repaid']))
-        total_due = Decimal(str(serializer.data['total_due']))
+        try:
+            with transaction.atomic():
+                # Lock the loan so concurrent repayments see each other's totals
+                loan = Loan.objects.select_for_update().get(pk=loan.pk)
+
+                # ❗ NEW: Prevent overpayment
+                if amount > loan.remaining_amount:
+                    return Response({"detail": "You cannot repay more than the remaining loan amount."}, status=400)
+
+                # Create repayment record and update the loan's totals
+                repayment = record_repayment(loan, amount)
+
+                # Deduct from wallet + log transaction
+                debit(
+                    wallet,
+                    amount,
+                    'LOAN_REPAY',
+                    reference_id=f"LOAN-{loan.id}",
+                    description=f"Loan repayment for Loan #{loan.id}",
+                    loan=loan,
+                    repayment=repayment,
+                )
+        except InsufficientFunds:
+            return Response({'detail': 'Insufficient wallet balance.'}, status=400)
 
-        if total_repaid >= total_due:
-            loan.status = 'PAID'
-            loan.save()
+        if loan.status == 'PAID':
             update_trust_score(request.user, +20)  # Reward for finishing loan
         else:
             update_trust_score(request.user, +5)   # Reward for each payment
@@ -156,28 +262,98 @@ class LoanViewset(viewsets.ModelViewSet):
         }, status=200)
 
 
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    @idempotent
+    def repay_all(self, request):
+        """
+        Repay across all of the caller's approved loans with one wallet debit:
+        {"amount": ..., "policy": "oldest_due" | "highest_interest" | "smallest_balance"}
+        """
+        policy = request.data.get('policy') or 'oldest_due'
+        if policy not in REPAYMENT_POLICIES:
+            return Response(
+                {'detail': f"policy must be one of: {', '.join(REPAYMENT_POLICIES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        amount = request.data.get('amount')
+        if not amount:
+            return Response({'detail': 'Repayment amount is required.'}, status=400)
+        try:
+            amount = Decimal(str(amount))
+        except ArithmeticError:
+            return Response({'detail': 'Invalid amount.'}, status=400)
+        if not amount.is_finite() or amount <= 0:
+            return Response({'detail': 'Repayment amount must be positive.'}, status=400)
+
+        try:
+            allocations = repay_loans(request.user, amount, policy)
+        except NothingToRepay:
+            return Response({'detail': 'You have no approved loans to repay.'}, status=400)
+        except Overpayment:
+            return Response({"detail": "You cannot repay more than the remaining amount of your loans."}, status=400)
+        except InsufficientFunds:
+            return Response({'detail': 'Insufficient wallet balance.'}, status=400)
+
+        # same rewards as one repay per loan
+        reward = sum(20 if a['status'] == 'PAID' else 5 for a in allocations)
+        bulk_adjust_trust_scores({request.user.pk: reward})
+
+        return Response({
+            "detail": "Repayment successful.",
+            "amount": amount,
+            "policy": policy,
+            "allocations": allocations,
+        }, status=200)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def flows(self, request, pk=None):
+        """Every wallet transaction of this loan: the disbursement and each repayment."""
+        loan = self.get_object()
+        flows = loan.transactions.order_by('created_at', 'pk')
+        return Response({
+            "loan_id": loan.id,
+            "transactions": TransactionSerializer(flows, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def installments(self, request, pk=None):
+        loan = self.get_object()
+        return Response({
+            "loan_id": loan.id,
+            "installments": InstallmentSerializer(loan.installments.order_by('number'), many=True).data,
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def overdue_installments(self, request):
+        """Every open installment past its due date, oldest first."""
+        installments = overdue_installments().order_by('due_date', 'pk')
+        page = self.paginate_queryset(installments)
+        return self.get_paginated_response(InstallmentSerializer(page, many=True).data)
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def active(self, request):
         user = request.user
 
-        # Find the active loan
-        loan = Loan.objects.filter(
-            user=user,
-            status="APPROVED"
-        ).first()
+        # All approved loans, the one due soonest first
+        loans = list(
+            Loan.objects.filter(user=user, status="APPROVED")
+            .annotate(next_due=next_due_date())
+            .order_by(F('next_due').asc(nulls_last=True), 'pk')
+        )
 
-        if not loan:
+        if not loans:
             return Response({"detail": "No active loan."}, status=200)
+        loan = loans[0]
 
-        # Calculate repayment stats
-        repayments = loan.repayments.filter(is_paid=True)
-        total_repaid = sum([r.amount for r in repayments])
-        total_due = loan.amount + (loan.amount * loan.interest_rate / 100)
+        # Repayment stats
+        total_repaid = loan.total_repaid
+        total_due = loan.total_due
 
-        # Fake next payment date (until we implement real schedule)
-        next_payment_date = None
-        if loan.due_date:
-            next_payment_date = loan.due_date
+        # Oldest installment that is not fully paid yet
+        installment = next_installment(loan)
+        next_payment_date = installment.due_date if installment else loan.due_date
+        next_payment_amount = installment.remaining if installment else loan.remaining_amount
 
         data = {
             "loan_id": loan.id,
@@ -191,8 +367,14 @@ class LoanViewset(viewsets.ModelViewSet):
             "progress_percent": round((total_repaid / total_due) * 100, 2) if total_due > 0 else 0,
 
             "next_payment_date": next_payment_date,
+            "next_payment_amount": str(next_payment_amount),
+            "is_overdue": bool(installment and installment.due_date < timezone.localdate()),
             "status": loan.status,
             "purpose": loan.purpose,
+
+            # other approved loans are repaid together through repay_all
+            "active_loan_count": len(loans),
+            "total_remaining": str(sum((l.remaining_amount for l in loans), Decimal('0'))),
         }
 
         return Response(data, status=200)
@@ -209,20 +391,12 @@ class LoanViewset(viewsets.ModelViewSet):
         results = []
 
         for loan in loans:
-            repayments = loan.repayments.filter(is_paid=True)
-            total_repaid = sum([r.amount for r in repayments])
-
-            # Paid date → last repayment date
-            paid_on = None
-            if repayments.exists():
-                paid_on = repayments.latest('payment_date').payment_date
-
             results.append({
                 "loan_id": loan.id,
                 "amount": str(loan.amount),
                 "purpose": loan.purpose,
-                "total_repaid": str(total_repaid),
-                "paid_on": paid_on,
+                "total_repaid": str(loan.total_repaid),
+                "paid_on": loan.last_payment_date,  # last repayment date
             })
 
         return Response(results, status=200)
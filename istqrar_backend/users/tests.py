@@ -1,3 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .models import TrustScore
+from .utils import bulk_adjust_trust_scores, get_trust_score, update_trust_score
+
+User = get_user_model()
+
+
+class TrustScoreCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='member')
+        self.other = User.objects.create(username='other')
+
+    def test_cached_score_is_served_without_a_query(self):
+        self.assertEqual(get_trust_score(self.user.pk), 50)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_trust_score(self.user.pk), 50)
+
+    def test_update_trust_score_invalidates_the_cache(self):
+        get_trust_score(self.user.pk)
+        update_trust_score(self.user, +15)
+
+        self.assertEqual(get_trust_score(self.user.pk), 65)
+
+    def test_bulk_adjust_invalidates_every_changed_user(self):
+        get_trust_score(self.user.pk)
+        get_trust_score(self.other.pk)
+        bulk_adjust_trust_scores({self.user.pk: -60, self.other.pk: +10})
+
+        self.assertEqual(get_trust_score(self.user.pk), 0)
+        self.assertEqual(get_trust_score(self.other.pk), 60)
+        self.assertEqual(TrustScore.objects.get(user=self.other).score, 60)
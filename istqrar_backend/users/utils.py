@@ -1,3 +1,35 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import TrustScore
+
+TRUST_SCORE_CACHE_TTL = 300  # seconds
+TRUST_SCORE_CACHE_KEY = 'users:trust_score:{user_id}'
+
+
+def get_trust_score(user_id):
+    """The user's trust score, read through the cache; None if the user has none."""
+    key = TRUST_SCORE_CACHE_KEY.format(user_id=user_id)
+    score = cache.get(key)
+    if score is None:
+        score = TrustScore.objects.filter(user_id=user_id).values_list('score', flat=True).first()
+        if score is not None:
+            cache.set(key, score, TRUST_SCORE_CACHE_TTL)
+    return score
+
+
+def invalidate_trust_scores(user_ids):
+    keys = [TRUST_SCORE_CACHE_KEY.format(user_id=user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    # and again once committed, in case the old value was re-read meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
 def update_trust_score(user, change):
     trust = user.trust_score
     new_score = trust.score + change
@@ -10,4 +42,26 @@ def update_trust_score(user, change):
 
     trust.score = new_score
     trust.save()
+    invalidate_trust_scores([user.pk])
     return trust.score
+
+
+def bulk_adjust_trust_scores(changes):
+    """
+    Apply {user_id: change} to many trust scores with a single UPDATE,
+    keeping every score between 0 and 100. Returns the number of rows updated.
+    """
+    changes = {user_id: change for user_id, change in changes.items() if change}
+    if not changes:
+        return 0
+
+    delta = Case(
+        *[When(user_id=user_id, then=Value(Decimal(change))) for user_id, change in changes.items()],
+        output_field=DecimalField(max_digits=5, decimal_places=2),
+    )
+    updated = TrustScore.objects.filter(user_id__in=changes).update(
+        score=Least(Greatest(F('score') + delta, Value(Decimal('0'))), Value(Decimal('100'))),
+        last_updated=timezone.now(),
+    )
+    invalidate_trust_scores(changes)
+    return updated
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wallet, Transaction
+from .models import Wallet, Transaction, BalanceCheckpoint, IdempotencyKey, TransactionRollup
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
@@ -11,3 +11,21 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ('wallet', 'transaction_type', 'amount', 'reference_id', 'created_at')
     list_filter = ('transaction_type',)
     search_fields = ('wallet__user__username', 'reference_id')
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'period', 'closing_balance', 'transaction_count')
+    list_filter = ('period',)
+    search_fields = ('wallet__user__username',)
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('user', 'key', 'status', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('user__username', 'key')
+
+@admin.register(TransactionRollup)
+class TransactionRollupAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'month', 'transaction_type', 'count', 'total')
+    list_filter = ('transaction_type', 'month')
+    search_fields = ('wallet__user__username',)
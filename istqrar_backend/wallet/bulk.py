@@ -0,0 +1,112 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+
+from .services import ensure_wallets, bulk_credit
+
+BULK_DEPOSIT_BATCH_SIZE = 500
+MAX_DEPOSIT_AMOUNT = Decimal('9999999999.99')  # fits Wallet.balance / Transaction.amount
+
+
+def read_deposit_csv(file):
+    """Rows of a CSV with a header of user_id or username, amount, and optional reference_id, description."""
+    if hasattr(file, 'read'):
+        file = file.read()
+    if isinstance(file, bytes):
+        file = file.decode('utf-8-sig')
+    return list(csv.DictReader(io.StringIO(file)))
+
+
+def validate_deposit_rows(rows):
+    """
+    Check every row before any money moves. Returns (valid, errors) where valid
+    rows are (row_number, user_id, amount, reference_id, description) and
+    errors are {"row": n, "error": "..."} dicts. Row numbers start at 1.
+    """
+    User = get_user_model()
+    usernames = {str(r.get('username')).strip() for r in rows if isinstance(r, dict) and r.get('username')}
+    user_ids = {str(r.get('user_id')).strip() for r in rows if isinstance(r, dict) and r.get('user_id')}
+    by_username = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+    known_ids = set(User.objects.filter(pk__in=[i for i in user_ids if i.isdigit()]).values_list('pk', flat=True))
+
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "error": "Row must be an object."})
+            continue
+
+        user_id = None
+        if row.get('user_id'):
+            raw_id = str(row['user_id']).strip()
+            if raw_id.isdigit() and int(raw_id) in known_ids:
+                user_id = int(raw_id)
+        elif row.get('username'):
+            user_id = by_username.get(str(row['username']).strip())
+        else:
+            errors.append({"row": number, "error": "user_id or username is required."})
+            continue
+        if user_id is None:
+            errors.append({"row": number, "error": "Unknown user."})
+            continue
+
+        try:
+            amount = Decimal(str(row.get('amount', '')).strip())
+        except InvalidOperation:
+            errors.append({"row": number, "error": "Invalid amount."})
+            continue
+        if not amount.is_finite():
+            errors.append({"row": number, "error": "Invalid amount."})
+            continue
+        if amount <= 0:
+            errors.append({"row": number, "error": "Amount must be positive."})
+            continue
+        if amount > MAX_DEPOSIT_AMOUNT:
+            errors.append({"row": number, "error": f"Amount must not exceed {MAX_DEPOSIT_AMOUNT}."})
+            continue
+        if amount != amount.quantize(Decimal('0.01')):
+            errors.append({"row": number, "error": "Amount has more than 2 decimal places."})
+            continue
+
+        valid.append((
+            number,
+            user_id,
+            amount,
+            str(row.get('reference_id') or 'WALLET-DEPOSIT')[:100],
+            str(row.get('description') or 'Bulk wallet deposit'),
+        ))
+    return valid, errors
+
+
+def ingest_deposits(rows, batch_size=BULK_DEPOSIT_BATCH_SIZE):
+    """
+    Validate all rows, then credit the valid ones in batches of `batch_size`,
+    each batch committed on its own. A failing batch is reported row by row
+    and does not stop the rest of the file.
+    """
+    valid, errors = validate_deposit_rows(rows)
+    wallets = ensure_wallets(user_id for _, user_id, _, _, _ in valid)
+
+    succeeded = 0
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        try:
+            bulk_credit(
+                [(wallets[user_id], amount, reference_id, description)
+                 for _, user_id, amount, reference_id, description in batch],
+                'DEPOSIT',
+            )
+        except DatabaseError as exc:
+            errors.extend({"row": number, "error": f"Batch failed: {exc}"} for number, *_ in batch)
+        else:
+            succeeded += len(batch)
+
+    errors.sort(key=lambda e: e['row'])
+    return {
+        "total": len(rows),
+        "succeeded": succeeded,
+        "failed": len(errors),
+        "errors": errors,
+    }
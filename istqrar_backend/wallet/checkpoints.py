@@ -0,0 +1,127 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Wallet, Transaction, BalanceCheckpoint
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(day):
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+def day_boundary(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_checkpoints(until=None, chunk_size=500):
+    """
+    Create the missing monthly checkpoints of every wallet, for every month that
+    ended before `until` (defaults to today). Already checkpointed months are
+    never recomputed, so repeated runs only pay for the new months.
+    """
+    until = month_start(until or timezone.localdate())
+    created = 0
+    chunk = []
+    for wallet_id in Wallet.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+        chunk.append(wallet_id)
+        if len(chunk) == chunk_size:
+            created += _build_chunk(chunk, until)
+            chunk = []
+    if chunk:
+        created += _build_chunk(chunk, until)
+    return created
+
+
+def _build_chunk(wallet_ids, until):
+    last_checkpoint = BalanceCheckpoint.objects.filter(wallet_id=OuterRef('pk')).order_by('-period').values('pk')[:1]
+    latest = {
+        checkpoint.wallet_id: checkpoint
+        for checkpoint in BalanceCheckpoint.objects.filter(
+            pk__in=Wallet.objects.filter(pk__in=wallet_ids).annotate(cp=Subquery(last_checkpoint)).values('cp')
+        )
+    }
+
+    transactions = Transaction.objects.filter(wallet_id__in=wallet_ids, created_at__lt=day_boundary(until))
+    if len(latest) == len(wallet_ids):
+        # every wallet already has checkpoints; only read past the oldest one
+        transactions = transactions.filter(created_at__gte=min(cp.closed_at for cp in latest.values()))
+
+    # (wallet, month) -> {transaction_type: (count, total)}
+    monthly = {}
+    for row in (
+        transactions.annotate(month=TruncMonth('created_at'))
+        .values('wallet_id', 'month', 'transaction_type')
+        .annotate(count=Count('id'), total=Sum('amount'))
+    ):
+        key = (row['wallet_id'], row['month'].date())
+        monthly.setdefault(key, {})[row['transaction_type']] = (row['count'], row['total'])
+
+    first_month = {}
+    for wallet_id, month in monthly:
+        if wallet_id not in first_month or month < first_month[wallet_id]:
+            first_month[wallet_id] = month
+
+    checkpoints = []
+    for wallet_id in wallet_ids:
+        previous = latest.get(wallet_id)
+        if previous:
+            month = next_month(previous.period)
+            balance = previous.closing_balance
+            count = previous.transaction_count
+            totals = {field: getattr(previous, field) for field in BalanceCheckpoint.TOTAL_FIELDS.values()}
+        elif wallet_id in first_month:
+            month = first_month[wallet_id]
+            balance = Decimal('0')
+            count = 0
+            totals = {field: Decimal('0') for field in BalanceCheckpoint.TOTAL_FIELDS.values()}
+        else:
+            continue  # no history yet
+
+        while month < until:
+            for transaction_type, (n, total) in monthly.get((wallet_id, month), {}).items():
+                totals[BalanceCheckpoint.TOTAL_FIELDS[transaction_type]] += total
+                count += n
+                balance += total if transaction_type in Transaction.CREDIT_TYPES else -total
+            checkpoints.append(BalanceCheckpoint(
+                wallet_id=wallet_id,
+                period=month,
+                closed_at=day_boundary(next_month(month)),
+                closing_balance=balance,
+                transaction_count=count,
+                **totals,
+            ))
+            month = next_month(month)
+
+    BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000, ignore_conflicts=True)
+    return len(checkpoints)
+
+
+def balance_before(wallet, moment):
+    """
+    Balance of `wallet` from every transaction created strictly before `moment`:
+    the nearest checkpoint plus only the transactions logged after it.
+    """
+    checkpoint = wallet.checkpoints.filter(closed_at__lte=moment).order_by('-closed_at').first()
+
+    tail = Transaction.objects.filter(wallet=wallet, created_at__lt=moment)
+    balance = Decimal('0')
+    if checkpoint:
+        tail = tail.filter(created_at__gte=checkpoint.closed_at)
+        balance = checkpoint.closing_balance
+
+    totals = tail.aggregate(
+        credits=Sum('amount', filter=Q(transaction_type__in=Transaction.CREDIT_TYPES)),
+        debits=Sum('amount', filter=Q(transaction_type__in=Transaction.DEBIT_TYPES)),
+        count=Count('id'),
+    )
+    balance += (totals['credits'] or 0) - (totals['debits'] or 0)
+    return balance, checkpoint, totals['count']
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', timedelta(hours=24))
+IN_FLIGHT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_IN_FLIGHT_TIMEOUT', timedelta(seconds=60))
+WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+MAX_KEYS_PER_USER = getattr(settings, 'IDEMPOTENCY_MAX_KEYS_PER_USER', 1000)
+POLL_INTERVAL = 0.1
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Returns (record, claimed). `claimed` is True when this request owns the key
+    and must run the view; otherwise `record` is the existing entry, which is
+    either completed, still in flight after WAIT_TIMEOUT, or for another request.
+    """
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    request_fingerprint=fingerprint,
+                    expires_at=now + IN_FLIGHT_TIMEOUT,
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            continue  # released in the meantime
+        if record.expires_at <= now:
+            # expired response, or an in-flight request that never finished
+            IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+            continue
+        if record.request_fingerprint != fingerprint or record.status == 'COMPLETED':
+            return record, False
+        if time.monotonic() >= deadline:
+            return record, False
+        time.sleep(POLL_INTERVAL)
+
+
+def evict_keys(user):
+    IdempotencyKey.objects.filter(user=user, expires_at__lte=timezone.now()).delete()
+    overflow = list(
+        IdempotencyKey.objects.filter(user=user, status='COMPLETED')
+        .order_by('-created_at')
+        .values_list('pk', flat=True)[MAX_KEYS_PER_USER:]
+    )
+    if overflow:
+        IdempotencyKey.objects.filter(pk__in=overflow).delete()
+
+
+def idempotent(view_method):
+    """
+    Make a POST action safe to retry with an `Idempotency-Key` header.
+
+    The first request with a key runs the view and stores its response for
+    KEY_TTL. Later requests with the same key and body get the stored response
+    back without running the view; a duplicate that arrives while the first is
+    still running waits for it. Requests without the header are unaffected.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {"detail": "Idempotency-Key must be at most 255 characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            if record.request_fingerprint != fingerprint:
+                return Response(
+                    {"detail": "This Idempotency-Key was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status == 'COMPLETED':
+                response = Response(record.response_body, status=record.response_status)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            return Response(
+                {"detail": "A request with this Idempotency-Key is still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500 or not hasattr(response, 'data'):
+            # not a replayable outcome; let the client retry for real
+            record.delete()
+            return response
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            status='COMPLETED',
+            response_status=response.status_code,
+            response_body=response.data,
+            expires_at=timezone.now() + KEY_TTL,
+        )
+        evict_keys(request.user)
+        return response
+
+    return wrapper
@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from wallet.models import Wallet, Transaction
+from wallet.services import credit, debit, InsufficientFunds
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a single wallet with parallel writers and report throughput and lost updates. "
+        "Creates a throwaway user in the configured database and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--ops', type=int, default=50, help='Operations per writer.')
+        parser.add_argument(
+            '--mode',
+            choices=['atomic', 'legacy', 'both'],
+            default='both',
+            help='atomic = wallet.services, legacy = read/modify/save().',
+        )
+
+    def handle(self, *args, **options):
+        modes = ['legacy', 'atomic'] if options['mode'] == 'both' else [options['mode']]
+        for mode in modes:
+            self.run(mode, options['writers'], options['ops'])
+
+    def run(self, mode, writers, ops):
+        User = get_user_model()
+        user = User.objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        start_balance = Decimal(writers * ops)
+        wallet = Wallet.objects.create(user=user, balance=start_balance)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(ops):
+                    # alternate credits and debits of 1.00, so the expected end balance is unchanged
+                    try:
+                        if (n + i) % 2 == 0:
+                            self.credit(mode, wallet.pk, Decimal('1.00'))
+                        else:
+                            self.debit(mode, wallet.pk, Decimal('1.00'))
+                    except Exception as exc:
+                        errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(writers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            wallet.refresh_from_db()
+            logged = Transaction.objects.filter(wallet=wallet)
+            credits = logged.filter(transaction_type='DEPOSIT').count()
+            debits = logged.filter(transaction_type='WITHDRAWAL').count()
+            expected = start_balance + credits - debits
+            total = writers * ops
+
+            self.stdout.write(f"[{mode}] {writers} writers x {ops} ops = {total} ops in {elapsed:.2f}s "
+                              f"({total / elapsed:.0f} ops/s)")
+            self.stdout.write(f"[{mode}] expected balance {expected}, actual {wallet.balance}, "
+                              f"lost updates {abs(expected - wallet.balance)}, errors {len(errors)}")
+        finally:
+            user.delete()
+
+    def credit(self, mode, wallet_id, amount):
+        wallet = Wallet.objects.get(pk=wallet_id)
+        if mode == 'atomic':
+            credit(wallet, amount, 'DEPOSIT', reference_id='BENCH')
+            return
+        wallet.balance += amount
+        wallet.save()
+        Transaction.objects.create(wallet=wallet, transaction_type='DEPOSIT', amount=amount, reference_id='BENCH')
+
+    def debit(self, mode, wallet_id, amount):
+        wallet = Wallet.objects.get(pk=wallet_id)
+        if mode == 'atomic':
+            try:
+                debit(wallet, amount, 'WITHDRAWAL', reference_id='BENCH')
+            except InsufficientFunds:
+                pass
+            return
+        if wallet.balance >= amount:
+            wallet.balance -= amount
+            wallet.save()
+            Transaction.objects.create(wallet=wallet, transaction_type='WITHDRAWAL', amount=amount, reference_id='BENCH')
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from wallet.checkpoints import build_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Create the missing monthly balance checkpoints for every wallet (incremental)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until',
+            help='YYYY-MM-DD; only months that ended before this date are closed (default: today).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help='Wallets per batch.')
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            until = parse_date(options['until'])
+            if until is None:
+                raise CommandError('--until must be a YYYY-MM-DD date.')
+
+        started = time.perf_counter()
+        created = build_checkpoints(until=until, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} checkpoints in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,41 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.bulk import BULK_DEPOSIT_BATCH_SIZE, read_deposit_csv, ingest_deposits
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a payroll / cash-in file of deposits. Accepts a CSV with a header "
+        "(user_id or username, amount, reference_id, description) or a JSON array."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BULK_DEPOSIT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as f:
+                if path.endswith('.json'):
+                    rows = json.load(f)
+                else:
+                    rows = read_deposit_csv(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+        if not isinstance(rows, list):
+            raise CommandError("JSON input must be an array of deposits.")
+
+        started = time.perf_counter()
+        report = ingest_deposits(rows, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['succeeded']}/{report['total']} deposits applied, {report['failed']} failed "
+            f"in {elapsed:.2f}s."
+        ))
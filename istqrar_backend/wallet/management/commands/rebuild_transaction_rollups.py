@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallet.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-wallet monthly transaction rollups from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {created} rollup rows in {time.perf_counter() - started:.2f}s."
+        ))
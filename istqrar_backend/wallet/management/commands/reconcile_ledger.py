@@ -0,0 +1,39 @@
+import json
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from wallet.reconcile import RECONCILE_CHECKS, RECONCILE_CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Cross-check contributions, payouts, loans and repayments against wallet transactions, "
+        "and wallet balances against their transactions. Mismatches are written as NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='append', choices=RECONCILE_CHECKS, dest='checks',
+            help='Run only this check (repeatable; default: all).',
+        )
+        parser.add_argument('--output', help='Write mismatches to this file instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=RECONCILE_CHUNK_SIZE, help='Rows fetched per round trip.')
+
+    def handle(self, *args, **options):
+        out = open(options['output'], 'w') if options['output'] else self.stdout
+        started = time.perf_counter()
+        found = Counter()
+        try:
+            for issue in reconcile(options['checks'], chunk_size=options['chunk_size']):
+                found[(issue['check'], issue['kind'])] += 1
+                out.write(json.dumps(issue, default=str) + '\n')
+        finally:
+            if options['output']:
+                out.close()
+
+        for (check, kind), count in sorted(found.items()):
+            self.stderr.write(f"{check}: {count} {kind}")
+        summary = f"Found {sum(found.values())} mismatches in {time.perf_counter() - started:.2f}s."
+        self.stderr.write(self.style.SUCCESS(summary) if not found else self.style.WARNING(summary))
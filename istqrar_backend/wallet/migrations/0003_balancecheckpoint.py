@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_transaction_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('closed_at', models.DateTimeField()),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('total_deposit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_withdrawal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_contribution', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_payout', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_loan_disburse', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_loan_repay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='wallet.wallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['wallet', 'closed_at'], name='wallet_checkpoint_idx')],
+                'unique_together': {('wallet', 'period')},
+            },
+        ),
+    ]
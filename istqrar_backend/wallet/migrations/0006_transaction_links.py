@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import re
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q
+
+BATCH_SIZE = 2000
+GAMEYA_REF = re.compile(r'^GAMEYA-(\d+)-ROUND-(\d+)$')
+LOAN_REF = re.compile(r'^LOAN-(\d+)$')
+
+
+def backfill_links(apps, schema_editor):
+    Transaction = apps.get_model('wallet', 'Transaction')
+    Gameya = apps.get_model('gameya', 'Gameya')
+    Loan = apps.get_model('loans', 'Loan')
+    Repayment = apps.get_model('loans', 'Repayment')
+
+    linked = Transaction.objects.filter(
+        Q(reference_id__startswith='GAMEYA-') | Q(reference_id__startswith='LOAN-')
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(linked.filter(pk__gt=last_pk).only('pk', 'reference_id')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        parsed = {}
+        for txn in batch:
+            match = GAMEYA_REF.match(txn.reference_id)
+            if match:
+                parsed[txn.pk] = ('gameya', int(match[1]), int(match[2]))
+                continue
+            match = LOAN_REF.match(txn.reference_id)
+            if match:
+                parsed[txn.pk] = ('loan', int(match[1]), None)
+
+        gameyas = set(Gameya.objects.filter(
+            pk__in={ref_id for kind, ref_id, _ in parsed.values() if kind == 'gameya'}
+        ).values_list('pk', flat=True))
+        loans = set(Loan.objects.filter(
+            pk__in={ref_id for kind, ref_id, _ in parsed.values() if kind == 'loan'}
+        ).values_list('pk', flat=True))
+
+        changed = []
+        for txn in batch:
+            if txn.pk not in parsed:
+                continue
+            kind, ref_id, round_no = parsed[txn.pk]
+            if kind == 'gameya' and ref_id in gameyas:
+                txn.gameya_id, txn.gameya_round = ref_id, round_no
+                changed.append(txn)
+            elif kind == 'loan' and ref_id in loans:
+                txn.loan_id = ref_id
+                changed.append(txn)
+        Transaction.objects.bulk_update(changed, ['gameya', 'gameya_round', 'loan'])
+
+    # Repayments and their LOAN_REPAY transactions were written together, so
+    # the n-th of each per loan belong together when the counts agree.
+    loan_ids = list(
+        Transaction.objects.filter(transaction_type='LOAN_REPAY', loan__isnull=False)
+        .order_by('loan_id').values_list('loan_id', flat=True).distinct()
+    )
+    for start in range(0, len(loan_ids), BATCH_SIZE):
+        chunk = loan_ids[start:start + BATCH_SIZE]
+        txns, repayments = defaultdict(list), defaultdict(list)
+        for txn in Transaction.objects.filter(transaction_type='LOAN_REPAY', loan_id__in=chunk).order_by('created_at', 'pk').only('pk', 'loan_id'):
+            txns[txn.loan_id].append(txn)
+        for repayment_id, loan_id in Repayment.objects.filter(loan_id__in=chunk, is_paid=True).order_by('pk').values_list('pk', 'loan_id'):
+            repayments[loan_id].append(repayment_id)
+
+        changed = []
+        for loan_id, loan_txns in txns.items():
+            if len(loan_txns) != len(repayments[loan_id]):
+                continue
+            for txn, repayment_id in zip(loan_txns, repayments[loan_id]):
+                txn.repayment_id = repayment_id
+                changed.append(txn)
+        Transaction.objects.bulk_update(changed, ['repayment'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gameya', '0008_gameya_discovery_indexes'),
+        ('loans', '0003_loan_repayment_period'),
+        ('wallet', '0005_transactionrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='gameya',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='gameya.gameya'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='gameya_round',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='loan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='loans.loan'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='repayment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='loans.repayment'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['gameya', 'gameya_round'], name='wallet_txn_gameya_round_idx'),
+        ),
+        migrations.RunPython(backfill_links, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 
 # Create your models here.
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 
 User = settings.AUTH_USER_MODEL
 
@@ -14,16 +17,22 @@ class Wallet(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Wallet - {self.balance}"
 
+    # Balance changes are single conditional UPDATEs so concurrent writers
+    # never overwrite each other; the instance is refreshed afterwards.
     def deposit(self, amount):
-        self.balance += amount
-        self.save()
+        Wallet.objects.filter(pk=self.pk).update(
+            balance=F('balance') + amount,
+            last_updated=timezone.now(),
+        )
+        self.refresh_from_db(fields=['balance', 'last_updated'])
 
     def withdraw(self, amount):
-        if self.balance >= amount:
-            self.balance -= amount
-            self.save()
-            return True
-        return False
+        updated = Wallet.objects.filter(pk=self.pk, balance__gte=amount).update(
+            balance=F('balance') - amount,
+            last_updated=timezone.now(),
+        )
+        self.refresh_from_db(fields=['balance', 'last_updated'])
+        return updated == 1
 
 
 class Transaction(models.Model):
@@ -35,6 +44,8 @@ class Transaction(models.Model):
         ('LOAN_DISBURSE', 'Loan Disbursement'),
         ('LOAN_REPAY', 'Loan Repayment'),
     ]
+    CREDIT_TYPES = ('DEPOSIT', 'PAYOUT', 'LOAN_DISBURSE')
+    DEBIT_TYPES = ('WITHDRAWAL', 'CONTRIBUTION', 'LOAN_REPAY')
 
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='transactions')
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
@@ -43,5 +54,101 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
 
+    # typed links to the object that caused the money movement
+    gameya = models.ForeignKey(
+        'gameya.Gameya', on_delete=models.SET_NULL, blank=True, null=True, related_name='transactions'
+    )
+    gameya_round = models.PositiveIntegerField(blank=True, null=True)
+    loan = models.ForeignKey(
+        'loans.Loan', on_delete=models.SET_NULL, blank=True, null=True, related_name='transactions'
+    )
+    repayment = models.ForeignKey(
+        'loans.Repayment', on_delete=models.SET_NULL, blank=True, null=True, related_name='transactions'
+    )
+
+    LINK_FIELDS = ('gameya', 'gameya_round', 'loan', 'repayment')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', 'created_at', 'id'], name='wallet_txn_feed_idx'),
+            models.Index(fields=['gameya', 'gameya_round'], name='wallet_txn_gameya_round_idx'),
+        ]
+
     def __str__(self):
         return f"{self.wallet.user.username} - {self.transaction_type} ({self.amount})"
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Closing balance of a wallet at the end of a month, with running totals
+    per transaction type since the wallet's first transaction.
+    """
+    # transaction_type -> running total column
+    TOTAL_FIELDS = {
+        'DEPOSIT': 'total_deposit',
+        'WITHDRAWAL': 'total_withdrawal',
+        'CONTRIBUTION': 'total_contribution',
+        'PAYOUT': 'total_payout',
+        'LOAN_DISBURSE': 'total_loan_disburse',
+        'LOAN_REPAY': 'total_loan_repay',
+    }
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='checkpoints')
+    period = models.DateField()  # first day of the month being closed
+    closed_at = models.DateTimeField()  # start of the next month; covers created_at < closed_at
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    transaction_count = models.PositiveIntegerField(default=0)
+    total_deposit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_withdrawal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_contribution = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_payout = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_loan_disburse = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_loan_repay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('wallet', 'period')
+        indexes = [
+            models.Index(fields=['wallet', 'closed_at'], name='wallet_checkpoint_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet.user.username} - {self.period:%Y-%m} ({self.closing_balance})"
+
+
+class TransactionRollup(models.Model):
+    """Count and sum of a wallet's transactions of one type in one month."""
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='rollups')
+    month = models.DateField()  # first day of the month
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('wallet', 'month', 'transaction_type')
+
+    def __str__(self):
+        return f"{self.wallet.user.username} - {self.month:%Y-%m} {self.transaction_type} ({self.total})"
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a POST sent with an Idempotency-Key header."""
+    STATUS_CHOICES = [
+        ('IN_FLIGHT', 'In flight'),
+        ('COMPLETED', 'Completed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='IN_FLIGHT')
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user} - {self.key} ({self.status})"
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    # Keyset pagination over the (wallet, created_at, id) index: no OFFSET scan
+    # and no COUNT(*), so deep pages cost the same as the first one.
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
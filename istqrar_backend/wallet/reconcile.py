@@ -0,0 +1,241 @@
+import operator
+from decimal import Decimal
+from functools import reduce
+from itertools import groupby
+
+from django.db.models import Count, Q, Sum
+
+from gameya.models import Contribution, PayoutSchedule
+from loans.models import Loan, Repayment
+from .models import Wallet, Transaction
+
+RECONCILE_CHUNK_SIZE = 2000
+
+
+def merge_join(left, right):
+    """
+    Merge two iterables of (key, value) that are both sorted by a unique key.
+    Yields (key, left_value, right_value), with None on the side that has no
+    row for that key. Only one row of each side is held at a time.
+    """
+    left, right = iter(left), iter(right)
+    missing = object()
+    l = next(left, missing)
+    r = next(right, missing)
+    while l is not missing or r is not missing:
+        if r is missing or (l is not missing and l[0] < r[0]):
+            yield l[0], l[1], None
+            l = next(left, missing)
+        elif l is missing or r[0] < l[0]:
+            yield r[0], None, r[1]
+            r = next(right, missing)
+        else:
+            yield l[0], l[1], r[1]
+            l = next(left, missing)
+            r = next(right, missing)
+
+
+def add_totals(a, b):
+    """Sum two amounts, where None (an amount the source never recorded) wins."""
+    return None if a is None or b is None else a + b
+
+
+def by_owner(rows):
+    """Group (owner_id, reference, count, total) rows, sorted by owner, into (owner_id, {reference: (count, total)})."""
+    for owner_id, group in groupby(rows, key=lambda row: row[0]):
+        refs = {}
+        for _, reference, count, total in group:
+            prev_count, prev_total = refs.get(reference, (0, Decimal('0')))
+            refs[reference] = (prev_count + count, add_totals(prev_total, total))
+        yield owner_id, refs
+
+
+def linked_transactions(transaction_type, fields):
+    """Transactions of the type whose link fields (transaction paths of `fields`) are all set."""
+    return Transaction.objects.filter(
+        transaction_type=transaction_type,
+        **{f'{path}__isnull': False for path in fields.values()},
+    )
+
+
+def transaction_rows(transaction_type, fields, chunk_size):
+    owner, *reference = fields.values()
+    rows = (
+        linked_transactions(transaction_type, fields)
+        .values_list(owner, *reference)
+        .annotate(count=Count('pk'), total=Sum('amount'))
+        .order_by(owner)
+        .iterator(chunk_size=chunk_size)
+    )
+    for owner_id, *ref, count, total in rows:
+        yield owner_id, tuple(ref), count, total
+
+
+def contribution_rows(chunk_size):
+    rows = (
+        Contribution.objects.filter(confirmed=True)
+        .values_list('membership__user_id', 'membership__gameya_id', 'month')
+        .annotate(count=Count('pk'), total=Sum('amount'))
+        .order_by('membership__user_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for user_id, gameya_id, month, count, total in rows:
+        yield user_id, (gameya_id, month), count, total
+
+
+def payout_rows(chunk_size):
+    # matched on (gameya, round): rounds paid before the schedule existed have no beneficiary or amount
+    rows = (
+        PayoutSchedule.objects.filter(status='PAID')
+        .values_list('gameya_id', 'round', 'amount')
+        .order_by('gameya_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for gameya_id, round_no, amount in rows:
+        yield gameya_id, (round_no,), 1, amount
+
+
+def disbursement_rows(chunk_size):
+    rows = (
+        Loan.objects.filter(status__in=('APPROVED', 'PAID'))
+        .values_list('user_id', 'pk', 'amount')
+        .order_by('user_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for user_id, loan_id, amount in rows:
+        yield user_id, (loan_id,), 1, amount
+
+
+def repayment_rows(chunk_size):
+    rows = (
+        Repayment.objects.filter(is_paid=True)
+        .values_list('loan__user_id', 'loan_id')
+        .annotate(count=Count('pk'), total=Sum('amount'))
+        .order_by('loan__user_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for user_id, loan_id, count, total in rows:
+        yield user_id, (loan_id,), count, total
+
+
+USER_GAMEYA_ROUND = {'user_id': 'wallet__user_id', 'gameya_id': 'gameya_id', 'gameya_round': 'gameya_round'}
+GAMEYA_ROUND = {'gameya_id': 'gameya_id', 'gameya_round': 'gameya_round'}
+USER_LOAN = {'user_id': 'wallet__user_id', 'loan_id': 'loan_id'}
+
+# check name -> (source records, transaction type, {output field: transaction path} with the
+# merge key first, source rows must be unique per reference)
+LEDGER_CHECKS = {
+    'contributions': (contribution_rows, 'CONTRIBUTION', USER_GAMEYA_ROUND, True),
+    'payouts': (payout_rows, 'PAYOUT', GAMEYA_ROUND, True),
+    'disbursements': (disbursement_rows, 'LOAN_DISBURSE', USER_LOAN, True),
+    'repayments': (repayment_rows, 'LOAN_REPAY', USER_LOAN, False),
+}
+
+
+def reconcile_ledger(check, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Compare one kind of source record with the wallet transactions linked to
+    it through their typed gameya/gameya_round/loan fields. Both sides are
+    streamed in owner order and merged one owner at a time, so memory stays
+    bounded by the busiest user (or gameya, for payouts). Transactions missing
+    the links are reported on their own.
+    """
+    source_rows, transaction_type, fields, unique = LEDGER_CHECKS[check]
+    names = list(fields)
+    expected_owners = by_owner(source_rows(chunk_size))
+    actual_owners = by_owner(transaction_rows(transaction_type, fields, chunk_size))
+
+    for owner_id, expected, actual in merge_join(expected_owners, actual_owners):
+        expected, actual = expected or {}, actual or {}
+        for reference in sorted(expected.keys() | actual.keys()):
+            exp_count, exp_total = expected.get(reference, (0, Decimal('0')))
+            act_count, act_total = actual.get(reference, (0, Decimal('0')))
+
+            if not act_count:
+                kind = 'missing_transaction'
+            elif not exp_count:
+                kind = 'unmatched_transaction'
+            elif unique and exp_count > 1:
+                kind = 'duplicate_record'
+            elif act_count > exp_count:
+                kind = 'duplicate_transaction'
+            elif act_count < exp_count:
+                kind = 'missing_transaction'
+            elif exp_total is not None and act_total != exp_total:
+                kind = 'amount_mismatch'
+            else:
+                continue
+
+            yield {
+                "check": check,
+                "kind": kind,
+                **dict(zip(names, (owner_id, *reference))),
+                "expected_count": exp_count,
+                "actual_count": act_count,
+                "expected_amount": exp_total,
+                "actual_amount": act_total,
+            }
+
+    unlinked = Transaction.objects.filter(
+        reduce(operator.or_, [Q(**{f'{path}__isnull': True}) for path in fields.values()]),
+        transaction_type=transaction_type,
+    )
+    for user_id, transaction_id, reference_id, amount in (
+        unlinked.order_by('pk').values_list('wallet__user_id', 'pk', 'reference_id', 'amount').iterator(chunk_size=chunk_size)
+    ):
+        yield {
+            "check": check,
+            "kind": 'unlinked_transaction',
+            "user_id": user_id,
+            "transaction_id": transaction_id,
+            "reference_id": reference_id,
+            "actual_amount": amount,
+        }
+
+
+def reconcile_balances(chunk_size=RECONCILE_CHUNK_SIZE):
+    """Wallets whose stored balance differs from credits minus debits of their transactions."""
+    wallets = (
+        (wallet_id, (user_id, balance))
+        for wallet_id, user_id, balance in
+        Wallet.objects.order_by('pk').values_list('pk', 'user_id', 'balance').iterator(chunk_size=chunk_size)
+    )
+    sums = (
+        (wallet_id, (credits or Decimal('0')) - (debits or Decimal('0')))
+        for wallet_id, credits, debits in
+        Transaction.objects.values_list('wallet_id')
+        .annotate(
+            credits=Sum('amount', filter=Q(transaction_type__in=Transaction.CREDIT_TYPES)),
+            debits=Sum('amount', filter=Q(transaction_type__in=Transaction.DEBIT_TYPES)),
+        )
+        .order_by('wallet_id')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for wallet_id, wallet, computed in merge_join(wallets, sums):
+        if wallet is None:
+            continue  # transactions of a deleted wallet are cascaded away
+        user_id, balance = wallet
+        computed = computed or Decimal('0')
+        if balance != computed:
+            yield {
+                "check": 'balances',
+                "kind": 'balance_mismatch',
+                "user_id": user_id,
+                "wallet_id": wallet_id,
+                "balance": balance,
+                "computed_balance": computed,
+                "difference": balance - computed,
+            }
+
+
+RECONCILE_CHECKS = [*LEDGER_CHECKS, 'balances']
+
+
+def reconcile(checks=None, chunk_size=RECONCILE_CHUNK_SIZE):
+    """Yield every mismatch found by the selected checks (default: all of them)."""
+    for check in checks or RECONCILE_CHECKS:
+        if check == 'balances':
+            yield from reconcile_balances(chunk_size)
+        else:
+            yield from reconcile_ledger(check, chunk_size)
@@ -0,0 +1,80 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .checkpoints import month_start
+from .models import Transaction, TransactionRollup
+
+
+def add_to_rollups(transactions):
+    """Fold freshly written Transactions into their monthly rollup rows."""
+    groups = defaultdict(lambda: [0, Decimal('0')])
+    for t in transactions:
+        key = (t.wallet_id, month_start(timezone.localtime(t.created_at).date()), t.transaction_type)
+        groups[key][0] += 1
+        groups[key][1] += t.amount
+    if not groups:
+        return
+
+    with transaction.atomic():
+        TransactionRollup.objects.bulk_create(
+            [TransactionRollup(wallet_id=w, month=m, transaction_type=t) for w, m, t in groups],
+            ignore_conflicts=True,
+        )
+        if len(groups) == 1:
+            ((wallet_id, month, transaction_type), (count, total)), = groups.items()
+            TransactionRollup.objects.filter(
+                wallet_id=wallet_id, month=month, transaction_type=transaction_type,
+            ).update(count=F('count') + count, total=F('total') + total)
+            return
+
+        # may over-fetch a few rows; only the exact keys are kept
+        rows = TransactionRollup.objects.filter(
+            wallet_id__in={w for w, _, _ in groups},
+            month__in={m for _, m, _ in groups},
+            transaction_type__in={t for _, _, t in groups},
+        ).values_list('pk', 'wallet_id', 'month', 'transaction_type')
+        pks = {(w, m, t): pk for pk, w, m, t in rows if (w, m, t) in groups}
+        TransactionRollup.objects.filter(pk__in=pks.values()).update(
+            count=F('count') + Case(
+                *[When(pk=pks[key], then=Value(count)) for key, (count, _) in groups.items()],
+                output_field=IntegerField(),
+            ),
+            total=F('total') + Case(
+                *[When(pk=pks[key], then=Value(total)) for key, (_, total) in groups.items()],
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute every rollup row from the Transaction table."""
+    grouped = (
+        Transaction.objects.annotate(month=TruncMonth('created_at'))
+        .values('wallet_id', 'month', 'transaction_type')
+        .annotate(count=Count('id'), total=Sum('amount'))
+        .order_by('wallet_id', 'month', 'transaction_type')
+    )
+    created = 0
+    with transaction.atomic():
+        TransactionRollup.objects.all().delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=batch_size):
+            batch.append(TransactionRollup(
+                wallet_id=row['wallet_id'],
+                month=row['month'].date(),
+                transaction_type=row['transaction_type'],
+                count=row['count'],
+                total=row['total'],
+            ))
+            if len(batch) == batch_size:
+                TransactionRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        TransactionRollup.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -19,4 +19,8 @@ class TransactionSerializer(serializers.ModelSerializer):
             'created_at',     
             'reference_id',
             'description',
+            'gameya',
+            'gameya_round',
+            'loan',
+            'repayment',
         ]
@@ -0,0 +1,139 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from .models import Wallet, Transaction
+from .rollups import add_to_rollups
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def get_wallet(user):
+    wallet, _ = Wallet.objects.get_or_create(user=user)
+    return wallet
+
+
+def credit(wallet, amount, transaction_type, reference_id=None, description=None, **links):
+    """
+    Add `amount` to the wallet and log the matching Transaction atomically.
+    `links` are the Transaction's source fields (gameya, gameya_round, loan, repayment).
+    """
+    with transaction.atomic():
+        wallet.deposit(amount)
+        logged = Transaction.objects.create(
+            wallet=wallet,
+            transaction_type=transaction_type,
+            amount=amount,
+            reference_id=reference_id,
+            description=description,
+            **links,
+        )
+        add_to_rollups([logged])
+        return logged
+
+
+def debit(wallet, amount, transaction_type, reference_id=None, description=None, **links):
+    """
+    Take `amount` from the wallet only if the balance covers it, and log the
+    matching Transaction atomically. Raises InsufficientFunds otherwise.
+    """
+    with transaction.atomic():
+        if not wallet.withdraw(amount):
+            raise InsufficientFunds()
+        logged = Transaction.objects.create(
+            wallet=wallet,
+            transaction_type=transaction_type,
+            amount=amount,
+            reference_id=reference_id,
+            description=description,
+            **links,
+        )
+        add_to_rollups([logged])
+        return logged
+
+
+def ensure_wallets(user_ids):
+    """Return {user_id: wallet_id}, creating the missing wallets in one insert."""
+    user_ids = set(user_ids)
+    wallets = dict(Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+    missing = user_ids - wallets.keys()
+    if missing:
+        Wallet.objects.bulk_create([Wallet(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+        wallets.update(Wallet.objects.filter(user_id__in=missing).values_list('user_id', 'pk'))
+    return wallets
+
+
+def build_transaction(entry, transaction_type):
+    wallet_id, amount, reference_id, description, *links = entry
+    return Transaction(
+        wallet_id=wallet_id,
+        transaction_type=transaction_type,
+        amount=amount,
+        reference_id=reference_id,
+        description=description,
+        **(links[0] if links else {}),
+    )
+
+
+def bulk_credit(entries, transaction_type):
+    """
+    Credit many wallets at once. `entries` is a list of
+    (wallet_id, amount, reference_id, description[, links]) tuples, where the
+    optional `links` dict holds Transaction source fields; a wallet may appear
+    more than once. All balances move in a single UPDATE and the Transactions
+    are inserted with one bulk_create, inside one atomic block.
+    """
+    per_wallet = defaultdict(Decimal)
+    for wallet_id, amount, *_ in entries:
+        per_wallet[wallet_id] += amount
+    if not per_wallet:
+        return []
+
+    with transaction.atomic():
+        Wallet.objects.filter(pk__in=per_wallet).update(
+            balance=F('balance') + Case(
+                *[When(pk=wallet_id, then=Value(total)) for wallet_id, total in per_wallet.items()],
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            last_updated=timezone.now(),
+        )
+        logged = Transaction.objects.bulk_create([
+            build_transaction(entry, transaction_type) for entry in entries
+        ])
+        add_to_rollups(logged)
+        return logged
+
+
+def bulk_debit(entries, transaction_type):
+    """
+    Debit many wallets at once; the counterpart of bulk_credit. The single
+    UPDATE only touches wallets whose balance covers their total, and if any
+    wallet falls short the whole batch is rolled back with InsufficientFunds.
+    """
+    per_wallet = defaultdict(Decimal)
+    for wallet_id, amount, *_ in entries:
+        per_wallet[wallet_id] += amount
+    if not per_wallet:
+        return []
+
+    total = Case(
+        *[When(pk=wallet_id, then=Value(total)) for wallet_id, total in per_wallet.items()],
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    with transaction.atomic():
+        updated = Wallet.objects.filter(pk__in=per_wallet, balance__gte=total).update(
+            balance=F('balance') - total,
+            last_updated=timezone.now(),
+        )
+        if updated != len(per_wallet):
+            raise InsufficientFunds()
+        logged = Transaction.objects.bulk_create([
+            build_transaction(entry, transaction_type) for entry in entries
+        ])
+        add_to_rollups(logged)
+        return logged
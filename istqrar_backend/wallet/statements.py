@@ -0,0 +1,40 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+STATEMENT_FIELDS = ['id', 'created_at', 'transaction_type', 'amount', 'reference_id', 'description']
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def statement_rows(queryset):
+    return (
+        queryset.order_by('created_at', 'id')
+        .values_list(*STATEMENT_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(STATEMENT_FIELDS)
+    for pk, created_at, *rest in statement_rows(queryset):
+        yield writer.writerow([pk, created_at.isoformat(), *rest])
+
+
+def iter_ndjson(queryset):
+    for row in statement_rows(queryset):
+        yield json.dumps(dict(zip(STATEMENT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+STATEMENT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
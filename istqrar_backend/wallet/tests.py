@@ -1,3 +1,372 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from gameya.models import Gameya
+from .bulk import ingest_deposits
+from .checkpoints import balance_before, build_checkpoints, month_start
+from .idempotency import request_fingerprint
+from .models import Wallet, Transaction, TransactionRollup, IdempotencyKey
+from .reconcile import reconcile
+from .rollups import rebuild_rollups
+from .services import credit, debit, bulk_credit, ensure_wallets, InsufficientFunds
+
+User = get_user_model()
+
+
+def logged_at(wallet, amount, transaction_type, moment):
+    move = credit if transaction_type in Transaction.CREDIT_TYPES else debit
+    logged = move(wallet, Decimal(amount), transaction_type)
+    Transaction.objects.filter(pk=logged.pk).update(created_at=timezone.make_aware(moment))
+    return logged
+
+
+class WalletWithdrawTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.wallet = Wallet.objects.create(user=self.user, balance=Decimal('50.00'))
+
+    def test_withdraw_refuses_overdraft(self):
+        self.assertFalse(self.wallet.withdraw(Decimal('50.01')))
+        self.assertEqual(self.wallet.balance, Decimal('50.00'))
+
+        self.assertTrue(self.wallet.withdraw(Decimal('50.00')))
+        self.assertEqual(self.wallet.balance, Decimal('0.00'))
+        self.assertFalse(self.wallet.withdraw(Decimal('0.01')))
+
+    def test_debit_overdraft_logs_nothing(self):
+        with self.assertRaises(InsufficientFunds):
+            debit(self.wallet, Decimal('75.00'), 'WITHDRAWAL')
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('50.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+
+class BulkDepositTests(TestCase):
+    url = '/api/wallet/deposit/bulk/'
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_csv_import(self):
+        upload = SimpleUploadedFile('deposits.csv', (
+            'username,amount,reference_id,description\n'
+            'alice,100.50,REF-1,Salary\n'
+            'bob,20,,\n'
+        ).encode('utf-8'), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertEqual(response.data['failed'], 0)
+        self.assertEqual(self.balance(self.alice), Decimal('100.50'))
+        self.assertEqual(self.balance(self.bob), Decimal('20.00'))
+        deposit = Transaction.objects.get(wallet__user=self.alice)
+        self.assertEqual((deposit.reference_id, deposit.description), ('REF-1', 'Salary'))
+
+    def test_json_import_reports_bad_rows_and_credits_the_rest(self):
+        response = self.client.post(self.url, {'deposits': [
+            {'user_id': self.alice.pk, 'amount': '10', 'reference_id': 12345, 'description': 7},
+            {'username': 'nobody', 'amount': '10'},
+            {'username': 'bob', 'amount': '-5'},
+            {'username': 'bob', 'amount': 'NaN'},
+            {'username': 'bob', 'amount': '99999999999'},
+            {'username': 'bob', 'amount': '1.001'},
+            {'amount': '10'},
+            'not a row',
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 8)
+        self.assertEqual(response.data['succeeded'], 1)
+        self.assertEqual([e['error'] for e in response.data['errors']], [
+            'Unknown user.',
+            'Amount must be positive.',
+            'Invalid amount.',
+            'Amount must not exceed 9999999999.99.',
+            'Amount has more than 2 decimal places.',
+            'user_id or username is required.',
+            'Row must be an object.',
+        ])
+        deposit = Transaction.objects.get(wallet__user=self.alice)
+        self.assertEqual((deposit.reference_id, deposit.description), ('12345', '7'))
+        self.assertFalse(Transaction.objects.filter(wallet__user=self.bob).exists())
+
+    def test_failed_batch_does_not_stop_the_rest(self):
+        rows = [{'username': 'alice', 'amount': '1'}] * 3 + [{'username': 'bob', 'amount': '1'}] * 2
+
+        def fail_first(entries, transaction_type):
+            if not fail_first.called:
+                fail_first.called = True
+                raise DatabaseError('locked')
+            return bulk_credit(entries, transaction_type)
+        fail_first.called = False
+
+        with patch('wallet.bulk.bulk_credit', side_effect=fail_first):
+            report = ingest_deposits(rows, batch_size=3)
+
+        self.assertEqual(report['succeeded'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [1, 2, 3])
+        self.assertEqual(self.balance(self.bob), Decimal('2.00'))
+        self.assertEqual(self.balance(self.alice), Decimal('0.00'))
+
+
+class ReconcilePayoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='member')
+        self.gameya = Gameya.objects.create(
+            name='Circle', creator=self.user, contribution_amount=100, duration_months=2,
+        )
+        self.wallet = Wallet.objects.create(user=self.user)
+
+    def test_backfilled_paid_round_matches_its_payout(self):
+        # rounds paid before the schedule existed carry no beneficiary or amount
+        self.gameya.payout_schedule.filter(round=1).update(status='PAID')
+        credit(self.wallet, Decimal('200.00'), 'PAYOUT', gameya=self.gameya, gameya_round=1)
+
+        self.assertEqual(list(reconcile(['payouts'])), [])
+
+    def test_reports_missing_and_unlinked_payouts(self):
+        self.gameya.payout_schedule.filter(round=1).update(status='PAID', amount=200)
+        credit(self.wallet, Decimal('200.00'), 'PAYOUT', reference_id=f'GAMEYA-{self.gameya.pk}-ROUND-1')
+
+        issues = list(reconcile(['payouts']))
+        self.assertEqual([i['kind'] for i in issues], ['missing_transaction', 'unlinked_transaction'])
+        self.assertEqual((issues[0]['gameya_id'], issues[0]['gameya_round']), (self.gameya.pk, 1))
+
+
+class TransactionFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.other = User.objects.create(username='other')
+        self.wallet = Wallet.objects.create(user=self.user)
+        for n in range(25):
+            credit(self.wallet, Decimal(n + 1), 'DEPOSIT')
+        credit(Wallet.objects.create(user=self.other), Decimal('5'), 'DEPOSIT')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_walk_the_whole_feed_newest_first(self):
+        seen, url = [], '/api/transactions/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        expected = list(
+            Transaction.objects.filter(wallet=self.wallet).order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 25)
+
+
+class StatementExportTests(TestCase):
+    url = '/api/transactions/statement/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.wallet = Wallet.objects.create(user=self.user)
+        for day, kind, amount in [(1, 'DEPOSIT', '100'), (10, 'WITHDRAWAL', '30'), (20, 'DEPOSIT', '50')]:
+            logged = logged_at(self.wallet, amount, kind, datetime(2026, 3, day, 12))
+            Transaction.objects.filter(pk=logged.pk).update(reference_id=f'REF-{day}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_is_filtered_by_date_and_type(self):
+        response, body = self.download('?start=2026-03-01&end=2026-03-10&transaction_type=deposit')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'created_at', 'transaction_type', 'amount', 'reference_id', 'description'])
+        self.assertEqual([(r[2], r[3], r[4]) for r in rows[1:]], [('DEPOSIT', '100.00', 'REF-1')])
+
+    def test_ndjson_lists_everything_in_order(self):
+        response, body = self.download('?output=ndjson')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['reference_id'] for r in rows], ['REF-1', 'REF-10', 'REF-20'])
+        self.assertEqual(rows[1]['amount'], '30.00')
+
+    def test_bad_parameters_are_rejected(self):
+        for query in ['?output=xml', '?start=March', '?transaction_type=BONUS']:
+            self.assertEqual(self.client.get(self.url + query).status_code, 400, query)
+
+
+class BalanceCheckpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.wallet = Wallet.objects.create(user=self.user)
+        logged_at(self.wallet, '100', 'DEPOSIT', datetime(2026, 1, 15, 12))
+        logged_at(self.wallet, '30', 'WITHDRAWAL', datetime(2026, 2, 10, 12))
+
+    def test_build_closes_each_ended_month(self):
+        self.assertEqual(build_checkpoints(until=date(2026, 3, 5)), 2)
+
+        january, february = self.wallet.checkpoints.order_by('period')
+        self.assertEqual((january.period, january.closing_balance), (date(2026, 1, 1), Decimal('100')))
+        self.assertEqual((february.closing_balance, february.transaction_count), (Decimal('70'), 2))
+        self.assertEqual((february.total_deposit, february.total_withdrawal), (Decimal('100'), Decimal('30')))
+        self.assertEqual(build_checkpoints(until=date(2026, 3, 5)), 0)
+
+    def test_incremental_build_starts_from_the_last_checkpoint(self):
+        build_checkpoints(until=date(2026, 3, 1))
+        logged_at(self.wallet, '50', 'DEPOSIT', datetime(2026, 3, 3, 12))
+        # a marker on February shows March is built from it, not from the full history
+        self.wallet.checkpoints.filter(period=date(2026, 2, 1)).update(closing_balance=Decimal('1070'))
+
+        self.assertEqual(build_checkpoints(until=date(2026, 4, 1)), 1)
+        march = self.wallet.checkpoints.get(period=date(2026, 3, 1))
+        self.assertEqual((march.closing_balance, march.transaction_count), (Decimal('1120'), 3))
+
+    def test_balance_before_adds_the_tail_after_the_checkpoint(self):
+        build_checkpoints(until=date(2026, 3, 1))
+        logged_at(self.wallet, '50', 'DEPOSIT', datetime(2026, 3, 3, 12))
+        logged_at(self.wallet, '5', 'WITHDRAWAL', datetime(2026, 3, 20, 12))
+
+        balance, checkpoint, tail = balance_before(self.wallet, timezone.make_aware(datetime(2026, 3, 10)))
+        self.assertEqual((balance, checkpoint.period, tail), (Decimal('120'), date(2026, 2, 1), 1))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/wallet/balance_at/?at=2026-03-20')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance'], Decimal('115'))
+        self.assertEqual(response.data['checkpoint_period'], date(2026, 2, 1))
+        self.assertEqual(response.data['transactions_after_checkpoint'], 2)
+        self.assertEqual(client.get('/api/wallet/balance_at/?at=soon').status_code, 400)
+
+    def test_wallet_without_checkpoints_sums_its_whole_history(self):
+        balance, checkpoint, tail = balance_before(self.wallet, timezone.make_aware(datetime(2026, 2, 11)))
+
+        self.assertEqual((balance, checkpoint, tail), (Decimal('70'), None, 2))
+
+
+class IdempotencyTests(TestCase):
+    url = '/api/wallet/deposit/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def deposit(self, amount, key='key-1'):
+        return self.client.post(self.url, {'amount': amount}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def balance(self):
+        return Wallet.objects.get(user=self.user).balance
+
+    def test_replay_returns_the_stored_response_without_crediting_again(self):
+        first = self.deposit('100')
+        second = self.deposit('100')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((second.status_code, second.data), (200, first.data))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.balance(), Decimal('100.00'))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_same_key_with_a_different_body_is_rejected(self):
+        self.deposit('100')
+
+        self.assertEqual(self.deposit('250').status_code, 422)
+        self.assertEqual(self.balance(), Decimal('100.00'))
+
+    def test_in_flight_key_answers_409(self):
+        request = SimpleNamespace(method='POST', path=self.url, data={'amount': '100'})
+        IdempotencyKey.objects.create(
+            user=self.user,
+            key='key-1',
+            request_fingerprint=request_fingerprint(request),
+            expires_at=timezone.now() + timedelta(seconds=60),
+        )
+
+        with patch('wallet.idempotency.WAIT_TIMEOUT', 0):
+            response = self.deposit('100')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.deposit('100')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertNotIn('Idempotent-Replayed', self.deposit('100'))
+        self.assertEqual(self.balance(), Decimal('200.00'))
+
+        self.deposit('5', key='key-2')
+        IdempotencyKey.objects.filter(key='key-1').update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['key-2'])
+
+
+class TransactionRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='holder')
+        self.other = User.objects.create(username='other')
+        self.wallet = Wallet.objects.create(user=self.user)
+
+    def rollups(self):
+        return sorted(
+            TransactionRollup.objects.values_list('wallet__user__username', 'month', 'transaction_type', 'count', 'total')
+        )
+
+    def test_writes_keep_rollups_current_and_rebuild_matches(self):
+        credit(self.wallet, Decimal('100'), 'DEPOSIT')
+        debit(self.wallet, Decimal('40'), 'WITHDRAWAL')
+        wallets = ensure_wallets([self.user.pk, self.other.pk])
+        bulk_credit([(wallets[self.user.pk], Decimal('10'), None, None),
+                     (wallets[self.other.pk], Decimal('7'), None, None)], 'DEPOSIT')
+
+        month = month_start(timezone.localdate())
+        live = self.rollups()
+        self.assertEqual(live, [
+            ('holder', month, 'DEPOSIT', 2, Decimal('110.00')),
+            ('holder', month, 'WITHDRAWAL', 1, Decimal('40.00')),
+            ('other', month, 'DEPOSIT', 1, Decimal('7.00')),
+        ])
+
+        TransactionRollup.objects.update(count=0, total=0)
+        self.assertEqual(rebuild_rollups(batch_size=2), 3)
+        self.assertEqual(self.rollups(), live)
+
+    def test_summary_reads_the_rollups(self):
+        logged_at(self.wallet, '100', 'DEPOSIT', datetime(2026, 1, 15, 12))
+        rebuild_rollups()
+        client = APIClient()
+        client.force_authenticate(self.user)
 
-# Create your tests here.
+        response = client.get('/api/wallet/summary/?months=120')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            {"month": date(2026, 1, 1), "totals": {"DEPOSIT": {"count": 1, "total": Decimal('100.00')}}},
+        ])
+        self.assertEqual(client.get('/api/wallet/summary/?months=0').status_code, 400)
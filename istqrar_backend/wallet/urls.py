@@ -1,15 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WalletViewSet, TransactionViewSet, DepositView
+from .views import WalletViewSet, TransactionViewSet, DepositView, BulkDepositView
 router = DefaultRouter()
 router.register('wallet', WalletViewSet, basename='wallet')
 router.register('transactions', TransactionViewSet, basename='transactions')
 
 deposit = DepositView.as_view({'post': 'add'})
+bulk_deposit = BulkDepositView.as_view({'post': 'add'})
 
 urlpatterns = [
     # CUSTOM ROUTES FIRST
     path('wallet/deposit/', deposit, name='wallet-deposit'),
+    path('wallet/deposit/bulk/', bulk_deposit, name='wallet-deposit-bulk'),
 
     # ROUTER ROUTES LAST
     path('', include(router.urls)),
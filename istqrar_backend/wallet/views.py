@@ -1,12 +1,32 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
-from .models import Wallet, Transaction
+from .models import Wallet, Transaction, TransactionRollup
 from .serializers import WalletSerializer, TransactionSerializer    
+from .services import get_wallet, credit
+from .idempotency import idempotent
+from .pagination import TransactionCursorPagination
+from .statements import STATEMENT_FORMATS
+from .checkpoints import balance_before, day_boundary, month_start
+from .bulk import read_deposit_csv, ingest_deposits
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 from rest_framework.decorators import action    
 from rest_framework.response import Response
+import csv
 import decimal
 
 # Create your views here.
+def parse_day(value):
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
 class WalletViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Wallet.objects.all()
     serializer_class = WalletSerializer
@@ -19,20 +39,119 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
     def me(self, request):
         wallet, _ = Wallet.objects.get_or_create(user=request.user)
         return Response(WalletSerializer(wallet).data)
+
+    @action(detail=False, methods=['get'])
+    def balance_at(self, request):
+        """
+        Balance at a point in time. `at` is either a date (end of that day)
+        or an ISO datetime.
+        """
+        at = request.query_params.get('at')
+        if not at:
+            return Response({"detail": "at is required."}, status=400)
+        try:
+            day = parse_date(at)
+            if day:
+                moment = day_boundary(day + timedelta(days=1))
+            else:
+                moment = parse_datetime(at)
+                if moment is None:
+                    raise ValueError(at)
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+        except ValueError:
+            return Response({"detail": "at must be a YYYY-MM-DD date or an ISO datetime."}, status=400)
+
+        wallet = get_wallet(request.user)
+        balance, checkpoint, tail_count = balance_before(wallet, moment)
+        return Response({
+            "at": moment,
+            "balance": balance,
+            "checkpoint_period": checkpoint.period if checkpoint else None,
+            "transactions_after_checkpoint": tail_count,
+        })
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Per-month count and total for each transaction type, read from the monthly rollups."""
+        try:
+            months = int(request.query_params.get('months', 12))
+        except ValueError:
+            return Response({"detail": "months must be a number."}, status=400)
+        if not 1 <= months <= 120:
+            return Response({"detail": "months must be between 1 and 120."}, status=400)
+
+        since = month_start(timezone.localdate())
+        for _ in range(months - 1):
+            since = month_start(since - timedelta(days=1))
+
+        rollups = TransactionRollup.objects.filter(
+            wallet__user=request.user,
+            month__gte=since,
+        ).order_by('-month', 'transaction_type')
+
+        data = {}
+        for r in rollups:
+            data.setdefault(r.month, {})[r.transaction_type] = {"count": r.count, "total": r.total}
+
+        return Response([{"month": month, "totals": totals} for month, totals in data.items()])
     
 
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Transaction.objects.all().order_by('-created_at')
+    queryset = Transaction.objects.all().order_by('-created_at', '-id')
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
-        wallet, _ = Wallet.objects.get_or_create(user=self.request.user)
-        return Transaction.objects.filter(wallet=wallet).order_by('-created_at')
+        wallet = get_wallet(self.request.user)
+        return Transaction.objects.filter(wallet=wallet).order_by('-created_at', '-id')
+
+    @action(detail=False, methods=['get'])
+    def statement(self, request):
+        """
+        Stream the full statement as CSV or NDJSON.
+        Query params: start, end (YYYY-MM-DD, inclusive), transaction_type (comma separated),
+        output (csv | ndjson).
+        """
+        output = request.query_params.get('output', 'csv')
+        if output not in STATEMENT_FORMATS:
+            return Response({"detail": "output must be one of: csv, ndjson."}, status=400)
+
+        queryset = Transaction.objects.filter(wallet__user=request.user)
+
+        try:
+            start = parse_day(request.query_params.get('start'))
+            end = parse_day(request.query_params.get('end'))
+        except ValueError:
+            return Response({"detail": "Dates must be in YYYY-MM-DD format."}, status=400)
+
+        # Compare against day boundaries so the (wallet, created_at) index can be used
+        if start:
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
+        if end:
+            queryset = queryset.filter(
+                created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+            )
+
+        types = request.query_params.get('transaction_type')
+        if types:
+            types = [t.strip().upper() for t in types.split(',') if t.strip()]
+            valid = dict(Transaction.TRANSACTION_TYPES)
+            unknown = [t for t in types if t not in valid]
+            if unknown:
+                return Response({"detail": f"Unknown transaction_type: {', '.join(unknown)}."}, status=400)
+            queryset = queryset.filter(transaction_type__in=types)
+
+        stream, content_type = STATEMENT_FORMATS[output]
+        response = StreamingHttpResponse(stream(queryset), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="statement.{output}"'
+        return response
 
 class DepositView(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent
     def add(self, request):   
         amount = request.data.get("amount")
 
@@ -40,15 +159,12 @@ class DepositView(viewsets.ViewSet):
             return Response({"detail": "Amount is required."}, status=400)
 
         amount = decimal.Decimal(amount)
-        wallet, _ = Wallet.objects.get_or_create(user=request.user)
+        wallet = get_wallet(request.user)
 
-        wallet.balance += amount
-        wallet.save()
-
-        Transaction.objects.create(
-            wallet=wallet,
-            transaction_type='DEPOSIT',
-            amount=amount,
+        credit(
+            wallet,
+            amount,
+            'DEPOSIT',
             reference_id="WALLET-DEPOSIT",
             description="Wallet deposit"
         )
@@ -57,3 +173,33 @@ class DepositView(viewsets.ViewSet):
             {"detail": "Wallet topped up successfully", "balance": wallet.balance},
             status=200
         )
+
+
+class BulkDepositView(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def add(self, request):
+        """
+        Accepts either a CSV upload in `file` or a JSON array of
+        {user_id | username, amount, reference_id?, description?} rows
+        (optionally wrapped as {"deposits": [...]}).
+        """
+        upload = request.FILES.get('file')
+        if upload:
+            try:
+                rows = read_deposit_csv(upload)
+            except (UnicodeDecodeError, csv.Error):
+                return Response({"detail": "File must be a UTF-8 CSV."}, status=400)
+        else:
+            rows = request.data
+            if isinstance(rows, dict):
+                rows = rows.get('deposits')
+            if not isinstance(rows, list):
+                return Response({"detail": "Send a CSV file or a JSON array of deposits."}, status=400)
+
+        if not rows:
+            return Response({"detail": "No deposits to process."}, status=400)
+
+        report = ingest_deposits(rows)
+        return Response(report, status=200)